@@ -1,35 +1,104 @@
 import tkinter as tk
-from tkinter import ttk
-import websocket
-import json
 import threading
-import requests
+import time
 from datetime import datetime
-from collections import deque
-import os
 
 # For candlestick chart
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle
+from matplotlib.ticker import FuncFormatter, MaxNLocator
 import numpy as np
 
-class CandlestickChart:
-    """Panel showing candlestick chart with matplotlib."""
+from streams import get_hub
+from scheduler import get_scheduler
+from candles import CandleBuffer
+from resample import Resampler, TIMEFRAMES
+from bars import BAR_TYPES
+from klinecache import get_kline_cache
+from bootstrap import get_bootstrapper
+from symbolcache import get_symbol_cache
+from symbols import get_symbol_universe
+
+UP_COLOR = '#00ff88'
+DOWN_COLOR = '#ff4444'
+UP_VOLUME_COLOR = '#00ff8844'
+DOWN_VOLUME_COLOR = '#ff444444'
+PRICE_COLOR = '#ffaa00'
 
-    def __init__(self, parent, symbol="BTCUSDT"):
+class CandlestickChart:
+    """Panel showing candlestick chart with matplotlib.
+
+    Closed candles live in persistent collections that are only rebuilt
+    when a candle closes or the window is resized. The live candle, its
+    volume bar and the price line are animated artists blitted on top of a
+    cached background, so a kline tick repaints just those pixels.
+    """
+
+    MAX_CANDLES = 50        # candles on screen
+    # Resampled timeframes offered; a screen of 1d candles would need 50
+    # days of 1m history, more than is worth keeping per symbol
+    CHART_TIMEFRAMES = [tf for tf, ms in TIMEFRAMES.items() if ms <= TIMEFRAMES["4h"]]
+    HISTORY_CAPACITY = 20000  # 1m candles kept in memory
+    # 1m candles fetched when the cache is short: a full screen of 4h candles
+    HISTORY_LIMIT = MAX_CANDLES * TIMEFRAMES["4h"] // TIMEFRAMES["1m"]
+    KLINE_PAGE = 1000         # Binance maximum per klines request
+    MAX_BACKFILL_PAGES = 20
+    BODY_WIDTH = 0.6
+    VOLUME_WIDTH = 0.4
+
+    def __init__(self, parent, symbol="BTCUSDT", hub=None, scheduler=None, timeframe="1m",
+                 kline_cache=None, bootstrap=None, symbol_cache=None, symbols=None):
         self.parent = parent
         self.symbol = symbol
         self.is_active = False
-        self.ws = None
-        self.candles = []
-        self.current_candle = None
+        self.hub = hub or get_hub()
+        self.scheduler = scheduler or get_scheduler(parent)
+        self.scheduler.register(self, self._update_chart)
+        self.kline_cache = kline_cache or get_kline_cache()
+        self.bootstrap = bootstrap or get_bootstrapper()
+        self.cache = symbol_cache or get_symbol_cache()
+        self.symbols = symbols or get_symbol_universe()
+        self.lock = threading.Lock()
+        self.generation = 0
+
+        # Per-symbol stream bookkeeping; cached symbols stay subscribed.
+        # ``loading`` maps a symbol to the generation of its history load.
+        self.streams = {}
+        self.pending = {}
+        self.loading = {}
+        self.cache.add_evict_listener(self._on_evict)
+        self.hub.add_resync_listener(self._on_resync)
+        self.candles = self._candles_for(symbol)
+        self.timeframe = timeframe
+        self.resampler = None
+        self.bar_builder = None
+        self.trade_stream = None
         self.is_visible = True
+        self.times = np.zeros(0, dtype='i8')
+        self.background = None
+        self.needs_full_redraw = True
 
         # Main frame
         self.frame = tk.Frame(parent, bg="#1e1e1e")
 
+        # Timeframe selector
+        toolbar = tk.Frame(self.frame, bg="#1e1e1e")
+        toolbar.pack(fill=tk.X, padx=10, pady=(5, 0))
+
+        tk.Label(toolbar, text="Timeframe:", font=("Segoe UI", 9),
+                 bg="#1e1e1e", fg="#888888").pack(side=tk.LEFT, padx=(0, 5))
+
+        self.timeframe_var = tk.StringVar(value=timeframe)
+        timeframe_menu = tk.OptionMenu(toolbar, self.timeframe_var,
+                                       *self.CHART_TIMEFRAMES, *BAR_TYPES,
+                                       command=self.set_timeframe)
+        timeframe_menu.config(font=("Segoe UI", 9), bg="#2d2d2d", fg="#ffffff",
+                              activebackground="#444444", relief="flat", highlightthickness=0)
+        timeframe_menu.pack(side=tk.LEFT)
+
         # Create matplotlib figure
         self.fig = Figure(figsize=(8, 4), facecolor='#1e1e1e')
         self.ax = self.fig.add_subplot(111)
@@ -49,18 +118,129 @@ class CandlestickChart:
         # Volume subplot
         self.ax_volume = self.ax.twinx()
         self.ax_volume.set_facecolor('#1e1e1e')
-        self.ax_volume.tick_params(colors='#888888')
+        self.ax_volume.tick_params(colors='#888888', labelsize=8)
+        self.ax_volume.set_ylabel('Volume', color='#888888', fontsize=8)
+        for spine in self.ax_volume.spines.values():
+            spine.set_color('#444444')
+
+        self.ax.tick_params(labelsize=8)
+        self.ax.xaxis.set_major_locator(MaxNLocator(nbins=8, integer=True))
+        self.ax.xaxis.set_major_formatter(FuncFormatter(self._format_time))
+        self.ax.set_xlim(-1, self.MAX_CANDLES)
+
+        self._create_artists()
+        self._build_resampler()
+        self._build_bar_builder()
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('resize_event', self._on_resize)
+
+    def _create_artists(self):
+        """Create the persistent artists that every redraw reuses."""
+        # Closed candles
+        self.wicks = LineCollection([], linewidths=1)
+        self.ax.add_collection(self.wicks)
+        self.bodies = PolyCollection([], linewidths=1)
+        self.ax.add_collection(self.bodies)
+
+        # One volume bar per slot; unused slots have zero height
+        self.volume_bars = self.ax_volume.bar(
+            range(self.MAX_CANDLES), [0] * self.MAX_CANDLES,
+            width=self.VOLUME_WIDTH, color=UP_VOLUME_COLOR, alpha=0.5
+        )
+
+        # Live candle and price line, drawn by blitting
+        self.live_wick = Line2D([], [], linewidth=1, animated=True)
+        self.ax.add_line(self.live_wick)
+        self.live_body = Rectangle((0, 0), self.BODY_WIDTH, 0, animated=True)
+        self.ax.add_patch(self.live_body)
+        self.live_volume = Rectangle((0, 0), self.VOLUME_WIDTH, 0, alpha=0.5, animated=True)
+        self.ax_volume.add_patch(self.live_volume)
+        self.price_line = self.ax.axhline(y=0, color=PRICE_COLOR, linestyle='--',
+                                          linewidth=1, alpha=0.7, animated=True)
+        self.price_text = self.ax.text(0, 0, '', color=PRICE_COLOR, fontsize=8,
+                                       va='center', animated=True)
+
+        self.live_artists = [
+            (self.ax_volume, self.live_volume),
+            (self.ax, self.live_wick),
+            (self.ax, self.live_body),
+            (self.ax, self.price_line),
+            (self.ax, self.price_text),
+        ]
 
     def set_symbol(self, symbol):
-        """Change the symbol being tracked."""
-        was_active = self.is_active
-        if was_active:
-            self.stop()
+        """Change the symbol being tracked.
+
+        A symbol still in the cache repaints at once from its warm 1m
+        history; trade-built bars always start empty.
+        """
         self.symbol = symbol.upper() + "USDT"
-        self.candles = []
-        self.current_candle = None
-        if was_active:
-            self.start()
+        candles = self._candles_for(self.symbol)
+        with self.lock:
+            self.candles = candles
+            self._build_resampler()
+            self._build_bar_builder()
+        self.needs_full_redraw = True
+        if self.is_active:
+            self._follow(self.symbol)
+        self._update_trade_subscription()
+        self.scheduler.mark_dirty(self)
+
+    def _candles_for(self, symbol):
+        """Return the cached 1m candles of a symbol, creating them if needed."""
+        state = self.cache.touch(symbol)
+        if state.candles is None:
+            state.candles = CandleBuffer(self.HISTORY_CAPACITY)
+        return state.candles
+
+    def set_timeframe(self, timeframe):
+        """Switch timeframe by resampling the local 1m history.
+
+        Trade-built bar types (see ``bars.BAR_TYPES``) start empty and fill
+        from the trade stream.
+        """
+        with self.lock:
+            self.timeframe = timeframe
+            self._build_resampler()
+            self._build_bar_builder()
+        self._update_trade_subscription()
+        self.needs_full_redraw = True
+        self.scheduler.mark_dirty(self)
+
+    def _build_resampler(self):
+        """Create the aggregator for the selected timeframe (none for 1m)."""
+        interval_ms = TIMEFRAMES.get(self.timeframe)
+        if interval_ms is None or interval_ms == TIMEFRAMES["1m"]:
+            self.resampler = None
+            return
+        capacity = self.HISTORY_CAPACITY * TIMEFRAMES["1m"] // interval_ms + 2
+        self.resampler = Resampler(interval_ms, capacity)
+        self.resampler.load(self.candles.last())
+
+    def _build_bar_builder(self):
+        """Create the trade bar builder for a trade-built bar type."""
+        factory = BAR_TYPES.get(self.timeframe)
+        self.bar_builder = factory() if factory else None
+
+    def _update_trade_subscription(self):
+        """Follow the trade stream only while a trade-built bar type is shown."""
+        wanted = None
+        if self.is_active and self.bar_builder is not None:
+            wanted = f"{self.symbol.lower()}@trade"
+        if wanted == self.trade_stream:
+            return
+        if self.trade_stream:
+            self.hub.unsubscribe(self.trade_stream, self._on_trade)
+        self.trade_stream = wanted
+        if wanted:
+            self.hub.subscribe(wanted, self._on_trade)
+
+    def _display_candles(self):
+        """Return the buffer holding candles of the selected timeframe."""
+        if self.bar_builder:
+            return self.bar_builder.candles
+        return self.resampler.candles if self.resampler else self.candles
 
     def show(self):
         """Show the panel."""
@@ -77,156 +257,409 @@ class CandlestickChart:
         if self.is_active:
             return
         self.is_active = True
-
-        # Fetch historical data first
-        self._fetch_historical()
-
-        # Connect to kline websocket for real-time updates
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@kline_1m"
-
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self._on_message,
-            on_error=lambda ws, err: print(f"Chart error: {err}"),
-            on_close=lambda ws, s, m: None,
-            on_open=lambda ws: print(f"Chart connected for {self.symbol}")
-        )
-
-        threading.Thread(target=self.ws.run_forever, daemon=True).start()
-
-    def _fetch_historical(self):
-        """Fetch historical candlestick data."""
+        self._follow(self.symbol)
+        self._update_trade_subscription()
+        self.scheduler.mark_dirty(self)
+
+    def _follow(self, symbol):
+        """Load a symbol's history and follow its klines, unless already live."""
+        with self.lock:
+            if symbol in self.streams or symbol in self.loading:
+                return
+            self.generation += 1
+            self.loading[symbol] = self.generation
+            generation = self.generation
+
+        # History loads on the bootstrap pool; the stream follows it
+        candles = self._candles_for(symbol)
+        self.pending[symbol] = self.bootstrap.submit(self._load_history, symbol, candles, generation)
+
+    def _unfollow(self, symbol):
+        """Unsubscribe from a symbol's klines and drop its pending load."""
+        future = self.pending.pop(symbol, None)
+        if future:
+            future.cancel()
+        with self.lock:
+            self.loading.pop(symbol, None)
+            stream = self.streams.pop(symbol, None)
+        if stream:
+            self.hub.unsubscribe(stream, self._on_message)
+
+    def _on_evict(self, symbol, state):
+        self._unfollow(symbol)
+
+    def _refresh(self, symbol):
+        """Rebuild derived candles and repaint if ``symbol`` is on screen (lock held)."""
+        if symbol != self.symbol:
+            return
+        self._build_resampler()
+        self.needs_full_redraw = True
+        self.scheduler.mark_dirty(self)
+
+    def _load_history(self, symbol, candles, generation):
+        """Show cached candles, backfill the gap, then follow the kline stream."""
+        self._load_cached(symbol, candles, generation)
+        self._fetch_historical(symbol, candles, generation)
+
+        # Subscribe to the kline stream for real-time updates
+        with self.lock:
+            if self.loading.get(symbol) != generation:
+                return
+            del self.loading[symbol]
+            self.pending.pop(symbol, None)
+            self.streams[symbol] = f"{symbol.lower()}@kline_1m"
+            self.hub.subscribe(self.streams[symbol], self._on_message)
+            self._refresh(symbol)
+
+    def _load_cached(self, symbol, candles, generation):
+        """Fill a 1m buffer from the on-disk kline cache."""
+        rows = self.kline_cache.load(symbol, "1m", self.HISTORY_CAPACITY)
+        with self.lock:
+            if self.loading.get(symbol) != generation:
+                return
+            candles.clear()
+            candles.extend(rows)
+            self._refresh(symbol)
+
+    def _fetch_historical(self, symbol, candles, generation):
+        """Backfill 1m candles between the newest cached one and now.
+
+        A cache too short to fill the longest timeframe is replaced by the
+        latest ``HISTORY_LIMIT`` candles instead.
+        """
         try:
-            url = "https://api.binance.com/api/v3/klines"
-            params = {
-                "symbol": self.symbol,
-                "interval": "1m",
-                "limit": 50
-            }
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-
-            self.candles = []
-            for candle in data:
-                self.candles.append({
-                    'time': datetime.fromtimestamp(candle[0] / 1000),
-                    'open': float(candle[1]),
-                    'high': float(candle[2]),
-                    'low': float(candle[3]),
-                    'close': float(candle[4]),
-                    'volume': float(candle[5])
-                })
-
-            self.parent.after(0, self._update_chart)
+            newest = candles.last_time()
+            start = None
+            if newest is not None and len(candles) >= self.HISTORY_LIMIT:
+                start = newest + TIMEFRAMES["1m"]
+            rows, replace = self._fetch_missing(symbol, start)
+
+            with self.lock:
+                if self.loading.get(symbol) != generation:
+                    return
+                if replace:
+                    candles.clear()
+                self._merge_history(candles, rows)
+                self._refresh(symbol)
         except Exception as e:
             print(f"Error fetching klines: {e}")
 
-    def _on_message(self, ws, message):
-        """Handle kline updates."""
-        if not self.is_active:
+    def _fetch_missing(self, symbol, start_time):
+        """Fetch 1m rows from ``start_time`` to now and cache the closed ones.
+
+        Returns (rows, replace); ``replace`` is True when the latest
+        history was fetched instead because there was no start time or
+        the gap was too long to page through.
+        """
+        data = None
+        if start_time is not None:
+            data = self._fetch_klines(symbol, start_time)
+        replace = data is None
+        if replace:
+            data = self._fetch_klines(symbol, None)
+
+        rows = [(candle[0], float(candle[1]), float(candle[2]),
+                 float(candle[3]), float(candle[4]), float(candle[5]))
+                for candle in data]
+
+        # The newest kline is usually still open; cache closed ones only
+        now_ms = time.time() * 1000
+        self.kline_cache.store(symbol, "1m",
+                               [row for row, candle in zip(rows, data) if candle[6] < now_ms])
+        return rows, replace
+
+    def _on_resync(self, streams):
+        """Hub resync listener: backfill symbols whose kline stream reconnected."""
+        for symbol, stream in list(self.streams.items()):
+            if stream in streams:
+                self.bootstrap.submit(self._resync_history, symbol)
+
+    def _resync_history(self, symbol):
+        """Fetch only the minutes missed while disconnected and splice them in."""
+        state = self.cache.peek(symbol)
+        if state is None or state.candles is None:
             return
+        candles = state.candles
+        try:
+            with self.lock:
+                newest = candles.last_time()
+            if newest is None:
+                return
+            # From the newest candle on: it may have missed its last updates
+            rows, replace = self._fetch_missing(symbol, newest)
+            with self.lock:
+                if symbol not in self.streams or state.candles is not candles:
+                    return
+                if replace:
+                    candles.clear()
+                self._splice_history(candles, rows)
+                self._refresh(symbol)
+        except Exception as e:
+            print(f"Error backfilling klines: {e}")
 
-        data = json.loads(message)
-        k = data['k']
-
-        candle = {
-            'time': datetime.fromtimestamp(k['t'] / 1000),
-            'open': float(k['o']),
-            'high': float(k['h']),
-            'low': float(k['l']),
-            'close': float(k['c']),
-            'volume': float(k['v']),
-            'closed': k['x']
-        }
-
-        # Update or add candle
-        if self.candles and self.candles[-1]['time'] == candle['time']:
-            self.candles[-1] = candle
-        else:
-            self.candles.append(candle)
-            if len(self.candles) > 50:
-                self.candles.pop(0)
-
-        self.parent.after(0, self._update_chart)
+    def _splice_history(self, candles, rows):
+        """Replace the buffer's candles from the first fetched row on.
 
-    def _update_chart(self):
-        """Redraw the candlestick chart."""
-        if not self.is_active or not self.candles:
+        Live candles at or after the newest fetched one are put back, so
+        ticks that arrived during the fetch are not lost.
+        """
+        if not rows:
+            return
+        live = candles.last(candles.count_since(rows[0][0])).tolist()
+        candles.drop_newest(len(live))
+        candles.extend(rows)
+        for row in live:
+            if row[0] >= rows[-1][0]:
+                candles.upsert(*row)
+
+    def _fetch_klines(self, symbol, start_time):
+        """Fetch 1m klines from ``start_time`` until now.
+
+        With no start time the latest ``HISTORY_LIMIT`` are fetched, paging
+        back from now. Returns None when the range needs more than
+        ``MAX_BACKFILL_PAGES`` requests.
+        """
+        params = {"symbol": symbol, "interval": "1m"}
+        if start_time is None:
+            data = []
+            while len(data) < self.HISTORY_LIMIT:
+                params["limit"] = min(self.KLINE_PAGE, self.HISTORY_LIMIT - len(data))
+                batch = self.bootstrap.get_json("/api/v3/klines", params)
+                data[:0] = batch
+                if len(batch) < params["limit"]:
+                    break  # the symbol has no older history
+                params["endTime"] = batch[0][0] - 1
+            return data
+
+        params["limit"] = self.KLINE_PAGE
+        data = []
+        for page in range(self.MAX_BACKFILL_PAGES):
+            params["startTime"] = start_time
+            batch = self.bootstrap.get_json("/api/v3/klines", params)
+            data.extend(batch)
+            if len(batch) < self.KLINE_PAGE:
+                return data
+            start_time = batch[-1][0] + TIMEFRAMES["1m"]
+        return None
+
+    def _merge_history(self, candles, rows):
+        """Append fetched rows newer than the buffer, refreshing an overlap."""
+        last = candles.last_time()
+        for row in rows:
+            if last is None or row[0] > last:
+                candles.append(*row)
+                last = row[0]
+            elif row[0] == last:
+                candles.update_last(*row)
+
+    def _on_message(self, data):
+        """Handle kline updates."""
+        symbol = data.symbol
+        state = self.cache.peek(symbol)
+        if not self.is_active or state is None or state.candles is None:
             return
 
-        self.ax.clear()
-        self.ax_volume.clear()
-
-        # Set colors
-        self.ax.set_facecolor('#1e1e1e')
-        self.ax_volume.set_facecolor('#1e1e1e')
+        # Update the live candle, or close it and start a new one
+        row = data.row()
+        with self.lock:
+            appended = state.candles.upsert(*row)
+            current = symbol == self.symbol
+            if current and self.resampler:
+                appended = self.resampler.update(*row)
+        if data.closed:
+            self.kline_cache.store(symbol, "1m", [row])
+        if not current or self.bar_builder:
+            return
+        if appended:
+            self.needs_full_redraw = True
 
-        times = [c['time'] for c in self.candles]
-        opens = [c['open'] for c in self.candles]
-        highs = [c['high'] for c in self.candles]
-        lows = [c['low'] for c in self.candles]
-        closes = [c['close'] for c in self.candles]
-        volumes = [c['volume'] for c in self.candles]
-
-        # Draw candlesticks
-        width = 0.0006  # Width of candlestick
-
-        for i, (t, o, h, l, c, v) in enumerate(zip(times, opens, highs, lows, closes, volumes)):
-            color = '#00ff88' if c >= o else '#ff4444'
-
-            # Draw wick
-            self.ax.plot([t, t], [l, h], color=color, linewidth=1)
-
-            # Draw body
-            body_low = min(o, c)
-            body_high = max(o, c)
-            body_height = body_high - body_low
-            if body_height == 0:
-                body_height = 0.01
-
-            rect = plt.Rectangle((mdates.date2num(t) - width/2, body_low),
-                                  width, body_height,
-                                  facecolor=color, edgecolor=color)
-            self.ax.add_patch(rect)
-
-            # Draw volume bar
-            vol_color = '#00ff8844' if c >= o else '#ff444444'
-            self.ax_volume.bar(t, v, width=0.0004, color=vol_color, alpha=0.5)
-
-        # Style axes
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-        self.ax.tick_params(colors='#888888', labelsize=8)
-        self.ax_volume.tick_params(colors='#888888', labelsize=8)
+        self.scheduler.mark_dirty(self)
 
-        for spine in self.ax.spines.values():
-            spine.set_color('#444444')
-        for spine in self.ax_volume.spines.values():
-            spine.set_color('#444444')
-
-        # Add current price line
-        if closes:
-            current_price = closes[-1]
-            self.ax.axhline(y=current_price, color='#ffaa00', linestyle='--',
-                           linewidth=1, alpha=0.7)
-            self.ax.text(times[-1], current_price, f' ${current_price:,.2f}',
-                        color='#ffaa00', fontsize=8, va='center')
+    def _on_trade(self, data):
+        """Fold a trade into the selected trade-built bars."""
+        if not self.is_active or data.symbol != self.symbol:
+            return
 
-        # Set title
-        self.ax.set_title(f'{self.symbol} 1m Chart', color='#ffffff', fontsize=10)
+        with self.lock:
+            if self.bar_builder is None:
+                return
+            opened = self.bar_builder.add_trade(data.price, data.qty, data.time)
+        if opened:
+            self.needs_full_redraw = True
+
+        self.scheduler.mark_dirty(self)
+
+    def _format_time(self, x, pos=None):
+        """Label an x position (candle index) with its candle time."""
+        i = int(round(x))
+        if 0 <= i < len(self.times):
+            if self.bar_builder:
+                time_format = '%H:%M:%S'
+            elif self.timeframe == "1d":
+                time_format = '%m-%d'
+            else:
+                time_format = '%H:%M'
+            return datetime.fromtimestamp(self.times[i] / 1000).strftime(time_format)
+        return ''
+
+    def _candle_color(self, candle):
+        return UP_COLOR if candle['close'] >= candle['open'] else DOWN_COLOR
+
+    def _body_bounds(self, candle):
+        """Return (bottom, height) of a candle body."""
+        body_low = min(candle['open'], candle['close'])
+        body_height = abs(candle['close'] - candle['open'])
+        if body_height == 0:
+            body_height = 0.01
+        return body_low, body_height
 
-        # Adjust volume axis
-        self.ax_volume.set_ylim(0, max(volumes) * 4 if volumes else 1)
-        self.ax_volume.set_ylabel('Volume', color='#888888', fontsize=8)
+    def _update_chart(self):
+        """Repaint the chart, blitting only the live candle when possible."""
+        if not self.is_active:
+            return
+        if not len(self._display_candles()):
+            self._draw_empty()
+            return
 
+        if self.needs_full_redraw or self.background is None:
+            self._full_redraw()
+        else:
+            self._blit_live()
+
+    def _full_redraw(self):
+        """Rebuild the closed-candle artists and redraw the whole figure."""
+        self.needs_full_redraw = False
+        with self.lock:
+            candles = self._display_candles().last(self.MAX_CANDLES).copy()
+        closed = candles[:-1]
+        self.times = candles['time']
+
+        # Vectorised geometry for every closed candle
+        x = np.arange(len(closed))
+        half = self.BODY_WIDTH / 2
+        up = closed['close'] >= closed['open']
+        body_low = np.minimum(closed['open'], closed['close'])
+        body_high = np.maximum(body_low + 0.01, np.maximum(closed['open'], closed['close']))
+
+        segments = np.empty((len(closed), 2, 2))
+        segments[:, :, 0] = x[:, None]
+        segments[:, 0, 1] = closed['low']
+        segments[:, 1, 1] = closed['high']
+
+        verts = np.empty((len(closed), 4, 2))
+        verts[:, 0:2, 0] = (x - half)[:, None]
+        verts[:, 2:4, 0] = (x + half)[:, None]
+        verts[:, [0, 3], 1] = body_low[:, None]
+        verts[:, [1, 2], 1] = body_high[:, None]
+
+        colors = np.where(up, UP_COLOR, DOWN_COLOR).tolist()
+        self.wicks.set_segments(segments)
+        self.wicks.set_color(colors)
+        self.bodies.set_verts(verts)
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+
+        volume_colors = np.where(up, UP_VOLUME_COLOR, DOWN_VOLUME_COLOR)
+        for i, bar in enumerate(self.volume_bars):
+            if i < len(closed):
+                bar.set_height(closed['volume'][i])
+                bar.set_facecolor(volume_colors[i])
+            else:
+                bar.set_height(0)
+
+        # Leave headroom so most live ticks fit without a rescale
+        low = candles['low'].min()
+        high = candles['high'].max()
+        pad = (high - low) * 0.05 or high * 0.001 or 1
+        self.ax.set_ylim(low - pad, high + pad)
+        max_volume = candles['volume'].max()
+        self.ax_volume.set_ylim(0, max_volume * 4 if max_volume else 1)
+
+        self.ax.set_title(self._title(), color='#ffffff', fontsize=10)
+
+        self._update_live(candles[-1], len(candles) - 1)
         self.fig.tight_layout()
         self.canvas.draw()
 
+    def _title(self):
+        title = f'{self.symbol} {self.timeframe} Chart'
+        return f'{title} (loading...)' if self.symbol in self.loading else title
+
+    def _draw_empty(self):
+        """Clear the candles and show the title while history loads."""
+        self.times = np.zeros(0, dtype='i8')
+        self.wicks.set_segments([])
+        self.bodies.set_verts([])
+        for bar in self.volume_bars:
+            bar.set_height(0)
+        self.live_wick.set_data([], [])
+        self.live_body.set_height(0)
+        self.live_volume.set_height(0)
+        self.price_line.set_ydata([np.nan, np.nan])
+        self.price_text.set_text('')
+        self.ax.set_title(self._title(), color='#ffffff', fontsize=10)
+        self.canvas.draw_idle()
+
+    def _blit_live(self):
+        """Redraw only the live candle and price line over the background."""
+        with self.lock:
+            candles = self._display_candles().last(self.MAX_CANDLES)
+            if not len(candles):
+                return
+            candle = candles[-1].copy()
+
+        # The live candle left the visible range, so the axes must rescale
+        ymin, ymax = self.ax.get_ylim()
+        if candle['low'] < ymin or candle['high'] > ymax \
+                or candle['volume'] > self.ax_volume.get_ylim()[1]:
+            self._full_redraw()
+            return
+
+        self._update_live(candle, len(candles) - 1)
+        self.canvas.restore_region(self.background)
+        self._draw_live()
+        self.canvas.blit(self.fig.bbox)
+
+    def _update_live(self, candle, i):
+        """Move the animated artists to the live candle."""
+        color = self._candle_color(candle)
+        body_low, body_height = self._body_bounds(candle)
+
+        self.live_wick.set_data([i, i], [candle['low'], candle['high']])
+        self.live_wick.set_color(color)
+        self.live_body.set_bounds(i - self.BODY_WIDTH / 2, body_low, self.BODY_WIDTH, body_height)
+        self.live_body.set_facecolor(color)
+        self.live_body.set_edgecolor(color)
+        self.live_volume.set_bounds(i - self.VOLUME_WIDTH / 2, 0, self.VOLUME_WIDTH, candle['volume'])
+        self.live_volume.set_facecolor(UP_VOLUME_COLOR if color == UP_COLOR else DOWN_VOLUME_COLOR)
+
+        price = candle['close']
+        self.price_line.set_ydata([price, price])
+        self.price_text.set_position((i + 0.5, price))
+        # Looked up per update so the exchange precision applies once loaded
+        self.price_text.set_text(f' ${self.symbols.get(self.symbol).price(price)}')
+
+    def _draw_live(self):
+        for ax, artist in self.live_artists:
+            ax.draw_artist(artist)
+
+    def _on_draw(self, event):
+        """Cache the static background after every full draw."""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_live()
+
+    def _on_resize(self, event):
+        """Lay the figure out again for the new size."""
+        self.background = None
+        self.needs_full_redraw = True
+        self.scheduler.mark_dirty(self)
+
     def stop(self):
-        """Stop WebSocket connection."""
+        """Stop candlestick updates."""
         self.is_active = False
-        if self.ws:
-            self.ws.close()
-            self.ws = None
+        for symbol in set(self.streams) | set(self.loading):
+            self._unfollow(symbol)
+        self._update_trade_subscription()
 
     def pack(self, **kwargs):
         self.frame.pack(**kwargs)
\ No newline at end of file
@@ -1,17 +1,23 @@
+import time
 import tkinter as tk
 
-from utils import load_preferences, save_preferences
+from utils import PreferencesStore
+from streams import StreamHub
+from scheduler import RenderScheduler
+from bootstrap import Bootstrapper
+from decoder import Decoder
+from symbolcache import SymbolCache
+from symbols import SymbolUniverse
 from ticker import CryptoTicker
 from orderbook import OrderBookPanel
 from TradesPanel import TradesPanel
-from CandlestickChart import CandlestickChart
 from PriceTable import PriceTable
 
 
 class CryptoDashboard:
     """Main cryptocurrency dashboard application."""
 
-    # Available cryptocurrencies (5+ as required)
+    # Default tickers; any other USDT pair can be picked from the search box
     AVAILABLE_CRYPTOS = [
         ("btcusdt", "BTC/USDT", "BTC"),
         ("ethusdt", "ETH/USDT", "ETH"),
@@ -22,21 +28,99 @@ class CryptoDashboard:
         ("maticusdt", "MATIC/USDT", "MATIC"),
     ]
 
-    def __init__(self, root):
+    PANELS = ("order_book", "trades", "chart", "price_table")
+    SEARCH_RESULTS = 8
+    LATENCY_REFRESH_MS = 1000
+    STARTUP_TIMEOUT = 30  # seconds to wait for first data before reporting anyway
+    CLOCK_SYNC_INTERVAL = 600  # seconds between exchange clock estimates
+
+    def __init__(self, root, record=None, replay=None, speed=1.0, latency_export=None,
+                 connect=None, ingest_process=None, startup=None):
         self.root = root
         self.root.title("Crypto Dashboard")
         self.root.geometry("1400x850")
         self.root.configure(bg="#121212")
 
-        # Load saved preferences
-        self.preferences = load_preferences()
+        # Load saved preferences; changes are written in the background
+        self.preferences = PreferencesStore()
         self.selected_symbol = self.preferences.get("selected_symbol", "BTC")
         self.is_closing = False
+        self.feed_failed = False  # set once the hub reports a dead feed
+        self.startup = startup  # StartupTimer, when a startup report was asked for
+
+        # Frame decoder backend: "auto" picks orjson when it is installed
+        decoder = Decoder(self.preferences.get("decoder", "auto"))
+
+        # Modules of the optional modes are only imported when chosen
+        if replay:
+            # Offline run: frames and REST responses come from a recorded log
+            from recorder import ReplayHub, ReplayBootstrapper
+            from klinecache import KlineCache
+            self.hub = ReplayHub(decoder)
+            self.bootstrap = ReplayBootstrapper(replay)
+            self.kline_cache = KlineCache(":memory:")
+        elif connect:
+            # Streams and snapshots come from a shared market data server
+            from server import ServerLink, ServerHub, ServerBootstrapper
+            from klinecache import get_kline_cache
+            link = ServerLink(connect)
+            self.hub = ServerHub(link, decoder)
+            self.bootstrap = ServerBootstrapper(link)
+            self.kline_cache = get_kline_cache()
+        else:
+            # One shared set of exchange connections for every panel, optionally
+            # read and decoded in a separate process
+            from klinecache import get_kline_cache
+            if ingest_process is None:
+                ingest_process = self.preferences.get("ingest_process", False)
+            if ingest_process:
+                from ingest import IngestHub
+                self.hub = IngestHub(decoder)
+            else:
+                self.hub = StreamHub(decoder)
+
+            # REST snapshots and history load in parallel off the Tk thread
+            self.bootstrap = Bootstrapper()
+            self.kline_cache = get_kline_cache()
+
+        # Optionally log every raw frame and REST response for later replay
+        self.recorder = None
+        if record:
+            from recorder import FeedRecorder
+            self.recorder = FeedRecorder(record)
+        self.hub.recorder = self.recorder
+        self.bootstrap.recorder = self.recorder
+        self.replayer = None
+
+        # Panels mark themselves dirty; repaints happen at a fixed frame rate
+        self.scheduler = RenderScheduler(self.root, fps=self.preferences.get("target_fps", 20))
+
+        # Exchange-to-paint latency, shown in the status bar and/or exported;
+        # the tracker is created the first time it is enabled
+        self.latency = None
+        self.latency_export = latency_export
+        self.last_clock_sync = 0
+        self.is_replay = bool(replay)
+
+        # Recently viewed symbols stay subscribed so switching back is instant
+        cache_prefs = self.preferences.get("symbol_cache", {})
+        self.symbol_cache = SymbolCache(
+            max_symbols=cache_prefs.get("max_symbols", 4),
+            max_bytes=cache_prefs.get("max_mb", 64) * 1024 * 1024
+        )
+
+        # Tradable pairs with their tick and lot sizes, loaded off the Tk thread
+        self.symbols = SymbolUniverse()
+        self.bootstrap.submit(self.symbols.load, self.bootstrap)
 
         # Toggle button references
         self.panel_toggle_buttons = {}
         self.crypto_toggle_buttons = {}
 
+        # Panels and tickers are built the first time they are shown
+        self.panels = {}
+        self.tickers = {}
+
         # Configure grid weights
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_columnconfigure(1, weight=1)
@@ -49,12 +133,25 @@ class CryptoDashboard:
         self._create_left_panel()
         self._create_middle_panel()
         self._create_right_panel()
+        self._create_status_bar()
 
         # Apply saved visibility preferences
         self._apply_preferences()
+        self._update_latency_tracking()
+        if self.startup:
+            self.startup.mark("widgets")
 
         # Start all components
         self._start_all()
+        if self.startup:
+            self.startup.mark("subscribe")
+            self._watch_first_data(time.time())
+
+        # Feed the recorded frames once every panel has subscribed
+        if replay:
+            from recorder import FeedReplayer
+            self.replayer = FeedReplayer(replay, self.hub, speed, on_done=self._on_replay_done)
+            self.replayer.start()
 
     def _create_header(self):
         """Create the header bar."""
@@ -166,11 +263,29 @@ class CryptoDashboard:
             btn.pack(side=tk.LEFT, padx=2)
             self.crypto_toggle_buttons[short] = btn
 
+        # Separator
+        tk.Frame(control_frame, bg="#444444", width=2).pack(side=tk.LEFT, fill=tk.Y, padx=15, pady=5)
+
+        # Latency overlay toggle
+        show_latency = self.preferences.get("latency_overlay", False)
+        self.latency_button = tk.Button(
+            control_frame,
+            text="Latency",
+            font=("Segoe UI", 9),
+            bg="#00ff88" if show_latency else "#444444",
+            fg="#000000" if show_latency else "#ffffff",
+            relief="flat",
+            padx=10,
+            pady=3,
+            command=self._toggle_latency
+        )
+        self.latency_button.pack(side=tk.LEFT, padx=10, pady=8)
+
     def _toggle_panel(self, panel_key, panel_label):
         """Toggle visibility of a panel."""
         current_state = self.preferences["visible_panels"].get(panel_key, True)
         new_state = not current_state
-        self.preferences["visible_panels"][panel_key] = new_state
+        self.preferences.set(("visible_panels", panel_key), new_state)
 
         # Update button appearance
         btn = self.panel_toggle_buttons[panel_key]
@@ -180,29 +295,24 @@ class CryptoDashboard:
             fg="#000000" if new_state else "#ffffff"
         )
 
-        # Show/hide the actual panel
-        panel_map = {
-            "order_book": self.order_book,
-            "trades": self.trades_panel,
-            "chart": self.chart,
-            "price_table": self.price_table
-        }
-
-        panel = panel_map.get(panel_key)
-        if panel:
-            if new_state:
-                panel.show()
+        # Show/hide the actual panel, building it on first show. Hidden panels
+        # drop their streams and resume from a fresh snapshot when shown again
+        panel = self.panels.get(panel_key)
+        if new_state:
+            if panel is None:
+                panel = self._build_panel(panel_key)
             else:
-                panel.hide()
-
-        # Save preferences
-        save_preferences(self.preferences)
+                panel.show()
+            panel.start()
+        elif panel:
+            panel.stop()
+            panel.hide()
 
     def _toggle_crypto(self, crypto_short):
         """Toggle visibility of a cryptocurrency ticker."""
         current_state = self.preferences["enabled_cryptos"].get(crypto_short, True)
         new_state = not current_state
-        self.preferences["enabled_cryptos"][crypto_short] = new_state
+        self.preferences.set(("enabled_cryptos", crypto_short), new_state)
 
         # Update button appearance
         btn = self.crypto_toggle_buttons[crypto_short]
@@ -211,40 +321,100 @@ class CryptoDashboard:
             fg="#000000" if new_state else "#ffffff"
         )
 
-        # Show/hide the ticker
+        # Show/hide the ticker, building it on first show
         symbol_key = f"{crypto_short.lower()}usdt"
-        if symbol_key in self.tickers:
-            ticker = self.tickers[symbol_key]
-            if new_state:
-                ticker.pack(fill=tk.X, pady=3)
-                ticker.start()
-            else:
-                ticker.stop()
-                ticker.pack_forget()
+        ticker = self.tickers.get(symbol_key)
+        if new_state:
+            if ticker is None:
+                ticker = self._build_ticker(symbol_key)
+            ticker.pack(fill=tk.X, pady=3)
+            ticker.start()
+        elif ticker:
+            ticker.stop()
+            ticker.pack_forget()
 
-        # Save preferences
-        save_preferences(self.preferences)
+    def _toggle_latency(self):
+        """Toggle the latency status bar."""
+        new_state = not self.preferences.get("latency_overlay", False)
+        self.preferences.set("latency_overlay", new_state)
+
+        self.latency_button.config(
+            bg="#00ff88" if new_state else "#444444",
+            fg="#000000" if new_state else "#ffffff"
+        )
+        if new_state:
+            self.latency_label.grid()
+        else:
+            self.latency_label.grid_remove()
+        self._update_latency_tracking()
+
+    def _update_latency_tracking(self):
+        """Stamp messages only while the overlay is shown or an export is set."""
+        enabled = self.preferences.get("latency_overlay", False) or self.latency_export
+        if enabled and self.latency is None:
+            from latency import LatencyTracker
+            self.latency = LatencyTracker()
+        tracker = self.latency if enabled else None
+        self.hub.latency = tracker
+        self.scheduler.latency = tracker
+
+    def _create_status_bar(self):
+        """Create the latency status bar below the panels."""
+        self.latency_label = tk.Label(
+            self.root,
+            text="Latency: waiting for data...",
+            font=("Consolas", 9),
+            bg="#1e1e1e",
+            fg="#888888",
+            anchor="w",
+            padx=10
+        )
+        self.latency_label.grid(row=3, column=0, columnspan=3, sticky="ew", padx=10, pady=(0, 5))
+        if not self.preferences.get("latency_overlay", False):
+            self.latency_label.grid_remove()
+
+    def _refresh_latency(self):
+        """Update the latency status bar and export file once a second.
+
+        Also turns the LIVE badge red once the hub reports a failed feed.
+        """
+        if self.is_closing:
+            return
+
+        if self.hub.failure and not self.feed_failed:
+            self.feed_failed = True
+            self.status_label.config(text="FEED DOWN", bg="#ff4444", fg="#ffffff")
+
+        if self.hub.latency:
+            # Re-estimate the exchange clock offset now and then
+            now = time.time()
+            if not self.is_replay and now - self.last_clock_sync > self.CLOCK_SYNC_INTERVAL:
+                self.last_clock_sync = now
+                self.bootstrap.submit(self.latency.sync_clock, self.bootstrap)
+
+            if self.preferences.get("latency_overlay", False):
+                self.latency_label.config(text=self.latency.summary())
+            if self.latency_export:
+                try:
+                    self.latency.export(self.latency_export)
+                except Exception as e:
+                    print(f"Error exporting latency: {e}")
+
+        self.root.after(self.LATENCY_REFRESH_MS, self._refresh_latency)
 
     def _create_left_panel(self):
         """Create the left panel with order book."""
         self.left_frame = tk.Frame(self.root, bg="#1e1e1e")
         self.left_frame.grid(row=2, column=0, sticky="nsew", padx=(10, 5), pady=10)
 
-        # Order Book
-        self.order_book = OrderBookPanel(self.left_frame, f"{self.selected_symbol}USDT")
-        self.order_book.pack(fill=tk.BOTH, expand=True)
-
     def _create_middle_panel(self):
         """Create the middle panel with trades and selection."""
         self.middle_frame = tk.Frame(self.root, bg="#1e1e1e")
         self.middle_frame.grid(row=2, column=1, sticky="nsew", padx=5, pady=10)
 
-        # Trades Panel
-        self.trades_panel = TradesPanel(self.middle_frame, f"{self.selected_symbol}USDT")
-        self.trades_panel.pack(fill=tk.BOTH, expand=True)
-
-        # Separator
-        tk.Frame(self.middle_frame, bg="#444444", height=2).pack(fill=tk.X, pady=10)
+        # Separator; the trades panel goes above it
+        self.trades_separator = tk.Frame(self.middle_frame, bg="#444444", height=2)
+        self.trades_separator.pack(fill=tk.X, pady=10)
 
         # Selection Panel (Tickers)
         selection_frame = tk.Frame(self.middle_frame, bg="#1e1e1e")
@@ -258,23 +428,69 @@ class CryptoDashboard:
             fg="#ffffff"
         ).pack(anchor="w", padx=10, pady=(5, 10))
 
+        # Search box over every pair; picking a result selects it
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            selection_frame,
+            textvariable=self.search_var,
+            font=("Segoe UI", 10),
+            bg="#2d2d2d",
+            fg="#ffffff",
+            insertbackground="#ffffff",
+            relief="flat"
+        )
+        search_entry.pack(fill=tk.X, padx=10, pady=(0, 5))
+        search_entry.bind("<KeyRelease>", self._on_search)
+        search_entry.bind("<Return>", self._on_search_pick)
+        search_entry.bind("<Down>", lambda e: self.search_list.focus_set())
+
+        self.search_list = tk.Listbox(
+            selection_frame,
+            height=self.SEARCH_RESULTS,
+            font=("Consolas", 10),
+            bg="#2d2d2d",
+            fg="#ffffff",
+            selectbackground="#3d5c3d",
+            relief="flat",
+            highlightthickness=0,
+            activestyle="none"
+        )
+        self.search_list.bind("<Double-Button-1>", self._on_search_pick)
+        self.search_list.bind("<Return>", self._on_search_pick)
+        self.search_results = []
+
         # Scrollable tickers frame
         tickers_container = tk.Frame(selection_frame, bg="#1e1e1e")
         tickers_container.pack(fill=tk.BOTH, expand=True, padx=10)
 
         self.tickers_frame = tk.Frame(tickers_container, bg="#1e1e1e")
         self.tickers_frame.pack(fill=tk.BOTH, expand=True)
+        self.search_anchor = tickers_container
 
-        # Create tickers for all available cryptos
-        self.tickers = {}
-        for symbol, display_name, short in self.AVAILABLE_CRYPTOS:
-            ticker = CryptoTicker(
-                self.tickers_frame,
-                symbol,
-                display_name,
-                on_select_callback=self._on_symbol_select
-            )
-            self.tickers[symbol] = ticker
+    def _on_search(self, event=None):
+        """Show the pairs matching the search text."""
+        if event is not None and event.keysym in ("Return", "Down", "Up"):
+            return
+        self.search_results = self.symbols.search(self.search_var.get(), self.SEARCH_RESULTS)
+        self.search_list.delete(0, tk.END)
+        if not self.search_results:
+            self.search_list.pack_forget()
+            return
+        for info in self.search_results:
+            self.search_list.insert(tk.END, f"{info.base}/{info.quote}")
+        self.search_list.config(height=len(self.search_results))
+        self.search_list.pack(fill=tk.X, padx=10, pady=(0, 5), before=self.search_anchor)
+
+    def _on_search_pick(self, event=None):
+        """Select the highlighted (or first) search result."""
+        if not self.search_results:
+            return
+        picked = self.search_list.curselection()
+        info = self.search_results[picked[0] if picked else 0]
+        self.search_var.set("")
+        self.search_results = []
+        self.search_list.pack_forget()
+        self._on_symbol_select(info.base)
 
     def _create_right_panel(self):
         """Create the right panel with chart and price table."""
@@ -290,40 +506,73 @@ class CryptoDashboard:
         self.chart_frame = tk.Frame(self.right_frame, bg="#1e1e1e")
         self.chart_frame.grid(row=0, column=0, sticky="nsew", pady=(0, 5))
 
-        self.chart = CandlestickChart(self.chart_frame, f"{self.selected_symbol}USDT")
-        self.chart.pack(fill=tk.BOTH, expand=True)
-
         # Price Table
         self.table_frame = tk.Frame(self.right_frame, bg="#1e1e1e")
         self.table_frame.grid(row=1, column=0, sticky="nsew", pady=(5, 0))
 
-        self.price_table = PriceTable(self.table_frame, f"{self.selected_symbol}USDT")
-        self.price_table.pack(fill=tk.BOTH, expand=True)
+    def _build_panel(self, key):
+        """Construct a panel in its place in the layout."""
+        symbol = f"{self.selected_symbol}USDT"
+        if key == "order_book":
+            panel = OrderBookPanel(
+                self.left_frame, symbol,
+                hub=self.hub, scheduler=self.scheduler, bootstrap=self.bootstrap,
+                symbol_cache=self.symbol_cache, symbols=self.symbols
+            )
+            panel.pack(fill=tk.BOTH, expand=True)
+        elif key == "trades":
+            panel = TradesPanel(
+                self.middle_frame, symbol,
+                hub=self.hub, scheduler=self.scheduler, bootstrap=self.bootstrap,
+                symbol_cache=self.symbol_cache, symbols=self.symbols
+            )
+            panel.pack(fill=tk.BOTH, expand=True, before=self.trades_separator)
+        elif key == "chart":
+            # matplotlib is only loaded once the chart is shown
+            from CandlestickChart import CandlestickChart
+            panel = CandlestickChart(
+                self.chart_frame, symbol,
+                hub=self.hub, scheduler=self.scheduler, bootstrap=self.bootstrap,
+                kline_cache=self.kline_cache, symbol_cache=self.symbol_cache,
+                symbols=self.symbols
+            )
+            panel.pack(fill=tk.BOTH, expand=True)
+        else:
+            panel = PriceTable(
+                self.table_frame, symbol,
+                hub=self.hub, scheduler=self.scheduler, bootstrap=self.bootstrap,
+                symbol_cache=self.symbol_cache, symbols=self.symbols
+            )
+            panel.pack(fill=tk.BOTH, expand=True)
+        self.panels[key] = panel
+        return panel
+
+    def _build_ticker(self, symbol):
+        """Construct the ticker of a symbol such as "btcusdt"."""
+        display_name = next(name for s, name, short in self.AVAILABLE_CRYPTOS if s == symbol)
+        ticker = CryptoTicker(
+            self.tickers_frame,
+            symbol,
+            display_name,
+            on_select_callback=self._on_symbol_select,
+            hub=self.hub,
+            scheduler=self.scheduler,
+            symbols=self.symbols
+        )
+        ticker.set_selected(symbol == f"{self.selected_symbol.lower()}usdt")
+        self.tickers[symbol] = ticker
+        return ticker
 
     def _apply_preferences(self):
-        """Apply saved preferences for panel and crypto visibility."""
-        # Apply panel visibility
-        panel_map = {
-            "order_book": self.order_book,
-            "trades": self.trades_panel,
-            "chart": self.chart,
-            "price_table": self.price_table
-        }
+        """Build the panels and tickers that are visible in the saved preferences."""
+        for key in self.PANELS:
+            if self.preferences["visible_panels"].get(key, True):
+                self._build_panel(key)
 
-        for key, panel in panel_map.items():
-            if not self.preferences["visible_panels"].get(key, True):
-                panel.hide()
-
-        # Apply crypto visibility - pack enabled ones
+        # Build and pack enabled tickers; disabled ones wait until enabled
         for symbol, display_name, short in self.AVAILABLE_CRYPTOS:
-            ticker = self.tickers[symbol]
             if self.preferences["enabled_cryptos"].get(short, True):
-                ticker.pack(fill=tk.X, pady=3)
-
-        # Highlight selected crypto
-        selected_symbol_key = f"{self.selected_symbol.lower()}usdt"
-        for symbol, ticker in self.tickers.items():
-            ticker.set_selected(symbol == selected_symbol_key)
+                self._build_ticker(symbol).pack(fill=tk.X, pady=3)
 
     def _on_symbol_select(self, symbol):
         """Handle symbol selection from ticker click."""
@@ -343,41 +592,76 @@ class CryptoDashboard:
         self.selected_label.config(text=f"Selected: {symbol}/USDT")
 
         # Save preference
-        self.preferences["selected_symbol"] = symbol
-        save_preferences(self.preferences)
+        self.preferences.set("selected_symbol", symbol)
 
         # Update all panels
-        self.order_book.set_symbol(symbol)
-        self.trades_panel.set_symbol(symbol)
-        self.chart.set_symbol(symbol)
-        self.price_table.set_symbol(symbol)
+        for panel in self.panels.values():
+            panel.set_symbol(symbol)
 
     def _start_all(self):
-        """Start all WebSocket connections."""
-        # Start enabled tickers
-        for symbol, display_name, short in self.AVAILABLE_CRYPTOS:
-            if self.preferences["enabled_cryptos"].get(short, True):
-                self.tickers[symbol].start()
+        """Start all stream subscriptions."""
+        self.scheduler.start()
+        self._refresh_latency()
+
+        # Start enabled tickers (the only ones built so far)
+        for ticker in self.tickers.values():
+            ticker.start()
 
-        # Start panels
-        self.order_book.start()
-        self.trades_panel.start()
-        self.chart.start()
-        self.price_table.start()
+        # Start visible panels; hidden ones start when shown
+        for panel in self.panels.values():
+            if panel.is_visible:
+                panel.start()
 
     def _stop_all(self):
-        """Stop all WebSocket connections."""
+        """Stop all stream subscriptions."""
         for ticker in self.tickers.values():
             ticker.stop()
 
-        self.order_book.stop()
-        self.trades_panel.stop()
-        self.chart.stop()
-        self.price_table.stop()
+        for panel in self.panels.values():
+            panel.stop()
+        self.hub.close()
+        self.scheduler.stop()
+        self.bootstrap.shutdown()
+        if self.replayer:
+            self.replayer.stop()
+        if self.recorder:
+            self.recorder.close()
+        if self.latency_export:
+            try:
+                self.latency.export(self.latency_export)
+            except Exception as e:
+                print(f"Error exporting latency: {e}")
+
+    def _watch_first_data(self, started):
+        """Poll until every built panel has data to paint, then print the startup report."""
+        if self.is_closing:
+            return
+        state = self.symbol_cache.peek(f"{self.selected_symbol}USDT")
+        has_data = {
+            "order_book": lambda s: s.book is not None and s.book.is_synced,
+            "trades": lambda s: s.trades is not None and len(s.trades) > 0,
+            "chart": lambda s: s.candles is not None and len(s.candles) > 0,
+            "price_table": lambda s: s.stats is not None
+        }
+        pending = []
+        for key in self.panels:
+            if state is not None and has_data[key](state):
+                self.startup.first_data(key)
+            elif key not in self.startup.first:
+                pending.append(key)
+
+        if pending and time.time() - started < self.STARTUP_TIMEOUT:
+            self.root.after(50, self._watch_first_data, started)
+            return
+        print(self.startup.report(pending))
+
+    def _on_replay_done(self, stats):
+        print(f"Replay finished: {stats['frames']} frames in {stats['elapsed']:.2f}s "
+              f"({stats['frames_per_second']:,.0f} frames/s, max lag {stats['max_lag']:.3f}s)")
 
     def on_closing(self):
         """Clean up when closing the application."""
         self.is_closing = True
         self._stop_all()
-        save_preferences(self.preferences)
+        self.preferences.close()
         self.root.destroy()
\ No newline at end of file
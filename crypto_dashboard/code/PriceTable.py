@@ -1,41 +1,50 @@
-import tkinter as tk
-from tkinter import ttk
-import websocket
-import json
 import threading
-import requests
-from datetime import datetime
-from collections import deque
-import os
-
-# For candlestick chart
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-import numpy as np
+import time
+import tkinter as tk
+
+from streams import get_hub
+from scheduler import get_scheduler
+from bootstrap import get_bootstrapper
+from symbolcache import get_symbol_cache
+from symbols import get_symbol_universe
+from decoder import Ticker
+from analytics import TradeAnalytics, WINDOWS
 
 class PriceTable:
     """Panel showing price statistics table."""
 
-    def __init__(self, parent, symbol="BTCUSDT"):
+    def __init__(self, parent, symbol="BTCUSDT", hub=None, scheduler=None, bootstrap=None,
+                 symbol_cache=None, symbols=None):
         self.parent = parent
         self.symbol = symbol
         self.is_active = False
-        self.ws = None
+        self.hub = hub or get_hub()
+        self.scheduler = scheduler or get_scheduler(parent)
+        self.scheduler.register(self, self._update_display)
         self.is_visible = True
+        self.bootstrap = bootstrap or get_bootstrapper()
+        self.cache = symbol_cache or get_symbol_cache()
+        self.symbols = symbols or get_symbol_universe()
+        self.lock = threading.Lock()  # guards the rolling analytics
+
+        # Per-symbol stream bookkeeping; cached symbols stay subscribed
+        self.streams = {}
+        self.pending = {}
+        self.cache.add_evict_listener(self._on_evict)
+        self.state = self.cache.touch(symbol)
 
         # Main frame
         self.frame = tk.Frame(parent, bg="#1e1e1e")
 
         # Title
-        tk.Label(
+        self.title_label = tk.Label(
             self.frame,
             text="24h Statistics",
             font=("Segoe UI", 12, "bold"),
             bg="#1e1e1e",
             fg="#ffffff"
-        ).pack(anchor="w", padx=10, pady=(10, 5))
+        )
+        self.title_label.pack(anchor="w", padx=10, pady=(10, 5))
 
         # Stats grid
         stats_frame = tk.Frame(self.frame, bg="#1e1e1e")
@@ -65,14 +74,52 @@ class PriceTable:
 
             self.stats[key] = value_label
 
+        # Rolling order flow from the trade stream, one column per window
+        tk.Label(
+            self.frame,
+            text="Order Flow",
+            font=("Segoe UI", 12, "bold"),
+            bg="#1e1e1e",
+            fg="#ffffff"
+        ).pack(anchor="w", padx=10, pady=(10, 5))
+
+        flow_frame = tk.Frame(self.frame, bg="#1e1e1e")
+        flow_frame.pack(fill=tk.X, padx=10, pady=5)
+        flow_frame.columnconfigure(0, weight=1)
+
+        for col, window in enumerate(WINDOWS, start=1):
+            tk.Label(flow_frame, text=window, font=("Segoe UI", 9),
+                    bg="#1e1e1e", fg="#888888", width=11, anchor="e").grid(row=0, column=col)
+
+        self.flow = {}
+        flow_config = [
+            ("VWAP", "vwap"),
+            ("Buy Volume", "buy_volume"),
+            ("Sell Volume", "sell_volume"),
+            ("Buy Share", "buy_share"),
+            ("Trades/s", "rate"),
+            ("Avg Size", "avg_size")
+        ]
+
+        for row, (label, key) in enumerate(flow_config, start=1):
+            tk.Label(flow_frame, text=label, font=("Segoe UI", 9),
+                    bg="#1e1e1e", fg="#888888", anchor="w").grid(row=row, column=0, sticky="w", pady=2)
+            for col, window in enumerate(WINDOWS, start=1):
+                value_label = tk.Label(flow_frame, text="--", font=("Consolas", 9),
+                                       bg="#1e1e1e", fg="#ffffff", width=11, anchor="e")
+                value_label.grid(row=row, column=col, pady=2)
+                self.flow[(key, window)] = value_label
+
     def set_symbol(self, symbol):
-        """Change the symbol being tracked."""
-        was_active = self.is_active
-        if was_active:
-            self.stop()
+        """Change the symbol being tracked.
+
+        A symbol still in the cache repaints at once from its last ticker.
+        """
         self.symbol = symbol.upper() + "USDT"
-        if was_active:
-            self.start()
+        self.state = self.cache.touch(self.symbol)
+        if self.is_active:
+            self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
 
     def show(self):
         """Show the panel."""
@@ -85,64 +132,156 @@ class PriceTable:
         self.frame.pack_forget()
 
     def start(self):
-        """Start WebSocket for ticker updates."""
+        """Subscribe to ticker updates."""
         if self.is_active:
             return
         self.is_active = True
+        self.state = self.cache.touch(self.symbol)
+        self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
 
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@ticker"
+    def _follow(self, symbol):
+        """Subscribe to a symbol's ticker and trades and fetch its stats, unless already live."""
+        if symbol in self.streams:
+            return
+        state = self.cache.touch(symbol)
+        state.stats = None
+        with self.lock:
+            # Windows restart empty: trades missed while unsubscribed would skew them
+            if state.analytics is None:
+                state.analytics = TradeAnalytics()
+            else:
+                state.analytics.clear()
 
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self._on_message,
-            on_error=lambda ws, err: print(f"Stats error: {err}"),
-            on_close=lambda ws, s, m: None,
-            on_open=lambda ws: print(f"Stats connected for {self.symbol}")
-        )
+        ticker_stream = f"{symbol.lower()}@ticker"
+        trade_stream = f"{symbol.lower()}@trade"
+        self.streams[symbol] = (ticker_stream, trade_stream)
+        self.hub.subscribe(ticker_stream, self._on_message)
+        self.hub.subscribe(trade_stream, self._on_trade)
+
+        # The stream pushes once a second; REST fills the table sooner
+        self.pending[symbol] = self.bootstrap.submit(self._fetch_stats, symbol, state)
+
+    def _unfollow(self, symbol):
+        """Unsubscribe from a symbol and drop its pending stats fetch."""
+        streams = self.streams.pop(symbol, None)
+        if streams:
+            ticker_stream, trade_stream = streams
+            self.hub.unsubscribe(ticker_stream, self._on_message)
+            self.hub.unsubscribe(trade_stream, self._on_trade)
+        future = self.pending.pop(symbol, None)
+        if future:
+            future.cancel()
+
+    def _on_evict(self, symbol, state):
+        self._unfollow(symbol)
+
+    def _fetch_stats(self, symbol, state):
+        """Fetch 24h statistics unless the stream already delivered them."""
+        data = self.bootstrap.get_json("/api/v3/ticker/24hr", {"symbol": symbol}, timeout=5)
+        self.pending.pop(symbol, None)
+        if symbol not in self.streams or state.stats is not None:
+            return
 
-        threading.Thread(target=self.ws.run_forever, daemon=True).start()
+        # Same record the @ticker stream delivers
+        state.stats = Ticker(
+            symbol, None,
+            float(data['lastPrice']),
+            float(data['openPrice']),
+            float(data['highPrice']),
+            float(data['lowPrice']),
+            float(data['volume']),
+            float(data['priceChange']),
+            float(data['priceChangePercent'])
+        )
+        if symbol == self.symbol:
+            self.scheduler.mark_dirty(self)
 
-    def _on_message(self, ws, message):
+    def _on_message(self, data):
         """Handle ticker updates."""
-        if not self.is_active:
+        state = self.cache.peek(data.symbol)
+        if not self.is_active or state is None:
+            return
+
+        state.stats = data
+        if data.symbol == self.symbol:
+            self.scheduler.mark_dirty(self)
+
+    def _on_trade(self, data):
+        """Add a trade to the symbol's rolling windows."""
+        state = self.cache.peek(data.symbol)
+        if not self.is_active or state is None or state.analytics is None:
             return
 
-        data = json.loads(message)
-        self.parent.after(0, self._update_display, data)
+        with self.lock:
+            state.analytics.add_trade(data.price, data.qty, data.time, data.is_buyer_maker)
+        if data.symbol == self.symbol:
+            self.scheduler.mark_dirty(self)
 
-    def _update_display(self, data):
-        """Update the stats display."""
+    def _update_flow(self, info):
+        """Update the order flow rows from the rolling windows."""
+        analytics = self.state.analytics
+        if analytics is None:
+            return
+        with self.lock:
+            snapshot = analytics.snapshot(int(time.time() * 1000))
+
+        for window, metrics in snapshot.items():
+            if metrics is None:
+                for key, label in self.flow.items():
+                    if key[1] == window:
+                        label.config(text="--", fg="#ffffff")
+                continue
+            share = metrics['buy_share']
+            self.flow[('vwap', window)].config(text="$" + info.price(metrics['vwap']))
+            self.flow[('buy_volume', window)].config(text=info.volume(metrics['buy_volume']))
+            self.flow[('sell_volume', window)].config(text=info.volume(metrics['sell_volume']))
+            self.flow[('buy_share', window)].config(
+                text=f"{share:.1f}%",
+                fg="#00ff88" if share >= 50 else "#ff4444"
+            )
+            self.flow[('rate', window)].config(text=f"{metrics['rate']:,.2f}")
+            self.flow[('avg_size', window)].config(text=info.qty(metrics['avg_size']))
+
+    def _update_display(self):
+        """Update the stats display from the latest ticker and trades."""
         if not self.is_active:
             return
+        info = self.symbols.get(self.symbol)
+        self._update_flow(info)
+        data = self.state.stats
+        if data is None:
+            self.title_label.config(text="24h Statistics (loading...)")
+            return
+        self.title_label.config(text="24h Statistics")
 
-        high = float(data['h'])
-        low = float(data['l'])
-        volume = float(data['v'])
-        change = float(data['p'])
-        change_pct = float(data['P'])
-        open_price = float(data['o'])
-        last = float(data['c'])
+        high = data.high
+        low = data.low
+        volume = data.volume
+        change = data.change
+        change_pct = data.change_pct
+        open_price = data.open
+        last = data.last
 
-        self.stats['high'].config(text=f"${high:,.2f}")
-        self.stats['low'].config(text=f"${low:,.2f}")
-        self.stats['volume'].config(text=f"{volume:,.2f}")
+        self.stats['high'].config(text="$" + info.price(high))
+        self.stats['low'].config(text="$" + info.price(low))
+        self.stats['volume'].config(text=info.volume(volume))
 
         change_color = "#00ff88" if change >= 0 else "#ff4444"
         sign = "+" if change >= 0 else ""
         self.stats['change'].config(
-            text=f"{sign}${change:,.2f} ({sign}{change_pct:.2f}%)",
+            text=f"{sign}${info.price(change)} ({sign}{change_pct:.2f}%)",
             fg=change_color
         )
 
-        self.stats['open'].config(text=f"${open_price:,.2f}")
-        self.stats['last'].config(text=f"${last:,.2f}")
+        self.stats['open'].config(text="$" + info.price(open_price))
+        self.stats['last'].config(text="$" + info.price(last))
 
     def stop(self):
-        """Stop WebSocket connection."""
+        """Stop ticker updates."""
         self.is_active = False
-        if self.ws:
-            self.ws.close()
-            self.ws = None
+        for symbol in list(self.streams):
+            self._unfollow(symbol)
 
     def pack(self, **kwargs):
         self.frame.pack(**kwargs)
\ No newline at end of file
@@ -1,82 +1,131 @@
 import tkinter as tk
-from collections import deque
-import websocket
-import json
 import threading
-from datetime import datetime
+import time
+
+from streams import get_hub
+from scheduler import get_scheduler
+from bootstrap import get_bootstrapper
+from symbolcache import get_symbol_cache
+from symbols import get_symbol_universe
+from tradestore import TradeStore
+from canvastable import CanvasTable
 
 class TradesPanel:
     """Panel showing recent trades."""
 
-    def __init__(self, parent, symbol="BTCUSDT"):
+    HISTORY_CAPACITY = 100_000  # trades kept per symbol
+    RECENT_LIMIT = 1000         # Binance maximum per recent trades request
+    VISIBLE_ROWS = 15           # initial height; the tape scrolls through all history
+    GAP_LIMIT = 256             # gap marks kept per symbol
+    GAP_COLOR = "#ffaa00"       # time of the first trade after missed ones
+
+    # Tape modes: (stream type, merge same price/side/ms trades client-side)
+    MODES = {
+        "Raw": ("trade", False),
+        "Merged": ("trade", True),
+        "Aggregated": ("aggTrade", True),
+    }
+
+    def __init__(self, parent, symbol="BTCUSDT", hub=None, scheduler=None, bootstrap=None,
+                 symbol_cache=None, mode="Raw", symbols=None):
         self.parent = parent
         self.symbol = symbol
         self.is_active = False
-        self.ws = None
-        self.trades = deque(maxlen=20)
+        self.hub = hub or get_hub()
+        self.scheduler = scheduler or get_scheduler(parent)
+        self.scheduler.register(self, self._update_display)
+        self.lock = threading.Lock()
         self.is_visible = True
+        self.bootstrap = bootstrap or get_bootstrapper()
+        self.cache = symbol_cache or get_symbol_cache()
+        self.symbols = symbols or get_symbol_universe()
+        self.info = self.symbols.get(symbol)  # formatters of the shown symbol
+        self.mode = mode if mode in self.MODES else "Raw"
+        self.stream_type, self.merge = self.MODES[self.mode]
+
+        # Per-symbol stream bookkeeping; cached symbols stay subscribed
+        self.streams = {}
+        self.pending = {}
+        self.loading = set()
+        # symbol -> {id of the first trade after a gap: trades missed}
+        self.gaps = {}
+        self.cache.add_evict_listener(self._on_evict)
+        self.trades = self._trades_for(symbol)
 
         # Main frame
         self.frame = tk.Frame(parent, bg="#1e1e1e")
 
         # Title
-        tk.Label(
-            self.frame,
+        title_frame = tk.Frame(self.frame, bg="#1e1e1e")
+        title_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+
+        self.title_label = tk.Label(
+            title_frame,
             text="Recent Trades",
             font=("Segoe UI", 12, "bold"),
             bg="#1e1e1e",
             fg="#ffffff"
-        ).pack(anchor="w", padx=10, pady=(10, 5))
-
-        # Headers
-        header_frame = tk.Frame(self.frame, bg="#1e1e1e")
-        header_frame.pack(fill=tk.X, padx=10)
+        )
+        self.title_label.pack(side=tk.LEFT)
 
-        tk.Label(header_frame, text="Price", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=10, anchor="e").pack(side=tk.LEFT)
-        tk.Label(header_frame, text="Amount", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=10, anchor="e").pack(side=tk.LEFT)
-        tk.Label(header_frame, text="Time", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=10, anchor="e").pack(side=tk.LEFT)
+        # Tape mode selector
+        self.mode_var = tk.StringVar(value=self.mode)
+        mode_menu = tk.OptionMenu(title_frame, self.mode_var, *self.MODES,
+                                  command=self.set_mode)
+        mode_menu.config(font=("Segoe UI", 9), bg="#2d2d2d", fg="#ffffff",
+                         activebackground="#444444", relief="flat", highlightthickness=0)
+        mode_menu.pack(side=tk.RIGHT)
 
-        # Trades list
-        self.trades_frame = tk.Frame(self.frame, bg="#1e1e1e")
-        self.trades_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        # Trades list, newest first
+        self.table = CanvasTable(
+            self.frame,
+            [("Price", 10, "#ffffff"), ("Amount", 14, "#cccccc"), ("Time", 10, "#888888")],
+            length=lambda: len(self.trades),
+            rows=self._visible_rows,
+            height=self.VISIBLE_ROWS
+        )
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        # Create trade rows
-        self.trade_labels = []
-        for i in range(15):
-            row = self._create_trade_row()
-            self.trade_labels.append(row)
+        # Formatted rows of the trades in view, by trade id
+        self.formatted = {}
 
-    def _create_trade_row(self):
-        """Create a row for trade entry."""
-        frame = tk.Frame(self.trades_frame, bg="#1e1e1e")
-        frame.pack(fill=tk.X)
+    def set_symbol(self, symbol):
+        """Change the symbol being tracked.
 
-        price_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                               bg="#1e1e1e", fg="#ffffff", width=10, anchor="e")
-        price_label.pack(side=tk.LEFT)
+        A symbol still in the cache repaints at once from its warm tape.
+        """
+        self.symbol = symbol.upper() + "USDT"
+        self.trades = self._trades_for(self.symbol)
+        self.formatted = {}
+        if self.is_active:
+            self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
 
-        amount_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                                bg="#1e1e1e", fg="#cccccc", width=10, anchor="e")
-        amount_label.pack(side=tk.LEFT)
+    def set_mode(self, mode):
+        """Switch between raw, merged and exchange-aggregated trades.
 
-        time_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                              bg="#1e1e1e", fg="#888888", width=10, anchor="e")
-        time_label.pack(side=tk.LEFT)
+        Raw and aggregated trade ids are not comparable, so every followed
+        symbol drops its tape and refills it from the new stream.
+        """
+        if mode == self.mode or mode not in self.MODES:
+            return
+        followed = list(self.streams)
+        for symbol in followed:
+            self._unfollow(symbol)
+        self.mode = mode
+        self.stream_type, self.merge = self.MODES[mode]
+        self.formatted = {}
+        if self.is_active:
+            for symbol in followed:
+                self._follow(symbol)
+        self.scheduler.mark_dirty(self)
 
-        return (price_label, amount_label, time_label)
-
-    def set_symbol(self, symbol):
-        """Change the symbol being tracked."""
-        was_active = self.is_active
-        if was_active:
-            self.stop()
-        self.symbol = symbol.upper() + "USDT"
-        self.trades.clear()
-        if was_active:
-            self.start()
+    def _trades_for(self, symbol):
+        """Return the cached tape of a symbol, creating it if needed."""
+        state = self.cache.touch(symbol)
+        if state.trades is None:
+            state.trades = TradeStore(self.HISTORY_CAPACITY)
+        return state.trades
 
     def show(self):
         """Show the panel."""
@@ -89,63 +138,178 @@ class TradesPanel:
         self.frame.pack_forget()
 
     def start(self):
-        """Start WebSocket for trade updates."""
+        """Subscribe to trade updates."""
         if self.is_active:
             return
         self.is_active = True
+        self.trades = self._trades_for(self.symbol)
+        self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
+
+    def _follow(self, symbol):
+        """Subscribe to a symbol's trades and fill its tape, unless already live."""
+        if symbol in self.streams:
+            return
+        trades = self._trades_for(symbol)
+        with self.lock:
+            trades.clear()
+            self.gaps.pop(symbol, None)
+            self.loading.add(symbol)
 
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@trade"
+        stream = f"{symbol.lower()}@{self.stream_type}"
+        self.streams[symbol] = stream
+        self.hub.subscribe(stream, self._on_message)
 
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self._on_message,
-            on_error=lambda ws, err: print(f"Trades error: {err}"),
-            on_close=lambda ws, s, m: None,
-            on_open=lambda ws: print(f"Trades connected for {self.symbol}")
-        )
+        # Fill the tape with recent history in the background
+        self.pending[symbol] = self.bootstrap.submit(self._fetch_recent, symbol, trades)
+
+    def _unfollow(self, symbol):
+        """Unsubscribe from a symbol and drop its pending history fetch."""
+        stream = self.streams.pop(symbol, None)
+        if stream:
+            self.hub.unsubscribe(stream, self._on_message)
+        future = self.pending.pop(symbol, None)
+        if future:
+            future.cancel()
+        with self.lock:
+            self.loading.discard(symbol)
+
+    def _on_evict(self, symbol, state):
+        self._unfollow(symbol)
+
+    def _fetch_recent(self, symbol, trades):
+        """Fetch recent trades and add those older than the live ones."""
+        aggregated = self.stream_type == "aggTrade"
+        try:
+            params = {"symbol": symbol, "limit": self.RECENT_LIMIT}
+            path = "/api/v3/aggTrades" if aggregated else "/api/v3/trades"
+            data = self.bootstrap.get_json(path, params, timeout=5)
+        except Exception as e:
+            print(f"Error fetching trades: {e}")
+            data = []
+
+        # Both endpoints as (id, time, price, qty, is_buyer_maker, fills)
+        if aggregated:
+            rows = [(item['a'], item['T'], float(item['p']), float(item['q']), item['m'],
+                     item['l'] - item['f'] + 1) for item in data]
+        else:
+            rows = [(item['id'], item['time'], float(item['price']), float(item['qty']),
+                     item['isBuyerMaker'], 1) for item in data]
 
-        threading.Thread(target=self.ws.run_forever, daemon=True).start()
+        with self.lock:
+            if symbol not in self.loading:
+                return
+            oldest_id = trades.oldest_id()
+            for row in reversed(rows):
+                if oldest_id is not None and row[0] >= oldest_id:
+                    continue
+                oldest = trades.oldest()
+                if self.merge and oldest and oldest[1:3] == row[1:3] and oldest[4] == row[4]:
+                    trades.merge_oldest(row[3], row[5])
+                elif not trades.append_older(*row):
+                    break
+                oldest_id = row[0]
+            self.loading.discard(symbol)
+            self.pending.pop(symbol, None)
+        if symbol == self.symbol:
+            # Merging into the oldest entry may have changed a visible row
+            self.formatted = {}
+            self.scheduler.mark_dirty(self)
 
-    def _on_message(self, ws, message):
+    def _on_message(self, data):
         """Handle trade updates."""
-        if not self.is_active:
+        state = self.cache.peek(data.symbol)
+        if not self.is_active or state is None or state.trades is None:
             return
 
-        data = json.loads(message)
-        trade = {
-            'price': float(data['p']),
-            'amount': float(data['q']),
-            'time': datetime.fromtimestamp(data['T'] / 1000),
-            'is_buyer_maker': data['m']
-        }
-        self.trades.appendleft(trade)
+        with self.lock:
+            newest = state.trades.newest()
+            if newest is not None and data.trade_id <= newest[0]:
+                return
+            # Ids are consecutive per symbol, so a jump means trades were missed
+            # (a reconnect or a dropped frame); the tape is marked, not refilled
+            missed = data.trade_id - newest[0] - 1 if newest is not None else 0
+            if missed > 0:
+                self._mark_gap(data.symbol, data.trade_id, missed, state.trades)
+                state.trades.append(data.trade_id, data.time, data.price, data.qty,
+                                    data.is_buyer_maker, data.fills)
+            elif (self.merge and newest is not None and newest[1] == data.time
+                    and newest[2] == data.price and newest[4] == data.is_buyer_maker):
+                # Same millisecond, price and side: one more fill of the last entry
+                state.trades.merge_newest(data.trade_id, data.qty, data.fills)
+                gaps = self.gaps.get(data.symbol)
+                if gaps and newest[0] in gaps:
+                    gaps[data.trade_id] = gaps.pop(newest[0])
+            else:
+                state.trades.append(data.trade_id, data.time, data.price, data.qty,
+                                    data.is_buyer_maker, data.fills)
+
+        if data.symbol == self.symbol:
+            self.scheduler.mark_dirty(self)
 
-        self.parent.after(0, self._update_display)
+    def _mark_gap(self, symbol, trade_id, missed, trades):
+        """Remember that ``missed`` trades came before ``trade_id`` (lock held)."""
+        gaps = self.gaps.setdefault(symbol, {})
+        gaps[trade_id] = missed
+        if len(gaps) > self.GAP_LIMIT:
+            # Forget marks of trades that fell off the tape
+            oldest_id = trades.oldest_id()
+            for old in [i for i in gaps if i < oldest_id]:
+                del gaps[old]
+        print(f"Trade gap for {symbol}: {missed} trades missed")
 
     def _update_display(self):
         """Update the trades display."""
         if not self.is_active or not self.frame.winfo_exists():
             return
 
-        for i, row in enumerate(self.trade_labels):
-            if i < len(self.trades):
-                trade = self.trades[i]
-                color = "#ff4444" if trade['is_buyer_maker'] else "#00ff88"
-                row[0].config(text=f"{trade['price']:,.2f}", fg=color)
-                row[1].config(text=f"{trade['amount']:.4f}")
-                row[2].config(text=trade['time'].strftime("%H:%M:%S"))
-            else:
-                row[0].config(text="--", fg="#ffffff")
-                row[1].config(text="--")
-                row[2].config(text="--")
+        title = "Recent Trades (loading...)" if self.symbol in self.loading else "Recent Trades"
+        self.title_label.config(text=title)
+
+        self.table.refresh()
+
+    def _visible_rows(self, start, n):
+        """Return table rows for the ``n`` trades from the ``start``-th newest.
+
+        Only trades that were not in view last time are formatted.
+        """
+        info = self.symbols.get(self.symbol)
+        if info is not self.info:
+            # New symbol, or its precision just became known
+            self.info = info
+            self.formatted = {}
+        with self.lock:
+            visible = self.trades.latest(n, skip=start)
+            gaps = self.gaps.get(self.symbol)
+
+        formatted = {}
+        rows = []
+        for trade in visible:
+            row = self.formatted.get(trade[0]) or self._format_trade(trade, gaps)
+            formatted[trade[0]] = row
+            rows.append(row)
+        self.formatted = formatted
+        return rows
+
+    def _format_trade(self, trade, gaps=None):
+        """Return the ((price, color), amount, time) cells of a trade tuple.
 
+        The time of a trade that follows a gap in ``gaps`` is highlighted.
+        """
+        trade_id, trade_time, price, qty, is_buyer_maker, fills = trade
+        info = self.info
+        color = "#ff4444" if is_buyer_maker else "#00ff88"
+        amount = f"{info.qty(qty)} x{fills}" if fills > 1 else info.qty(qty)
+        stamp = time.strftime("%H:%M:%S", time.localtime(trade_time / 1000))
+        if gaps and trade_id in gaps:
+            stamp = (stamp, self.GAP_COLOR)
+        return ((info.price(price), color), amount, stamp)
 
     def stop(self):
-        """Stop WebSocket connection."""
+        """Stop trade updates."""
         self.is_active = False
-        if self.ws:
-            self.ws.close()
-            self.ws = None
+        for symbol in list(self.streams):
+            self._unfollow(symbol)
 
     def pack(self, **kwargs):
         self.frame.pack(**kwargs)
\ No newline at end of file
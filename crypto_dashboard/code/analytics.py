@@ -0,0 +1,108 @@
+from array import array
+
+
+class RollingWindow:
+    """Trade sums over the last ``seconds`` seconds, in one-second buckets.
+
+    Each trade adds to the bucket of its second and to running totals.
+    When time moves on, buckets that fall out of the window are subtracted
+    from the totals and reused, so a trade costs O(1) and history is never
+    rescanned.
+    """
+
+    FIELDS = 5  # volume, quote volume, buy volume, sell volume, count
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        # One float array per field, indexed by second % seconds
+        self.sums = [array('d', bytes(8 * seconds)) for _ in range(self.FIELDS)]
+        self.totals = [0.0] * self.FIELDS
+        self.head = None   # newest second covered
+        self.first = None  # first second with data, to scale the rate while warming up
+
+    def clear(self):
+        self.sums = [array('d', bytes(8 * self.seconds)) for _ in range(self.FIELDS)]
+        self.totals = [0.0] * self.FIELDS
+        self.head = None
+        self.first = None
+
+    def advance(self, second):
+        """Move the window so it ends at ``second``, expiring old buckets."""
+        if self.head is None:
+            self.head = second
+            self.first = second
+            return
+        if second <= self.head:
+            return
+        start = max(self.head + 1, second - self.seconds + 1)
+        totals = self.totals
+        for s in range(start, second + 1):
+            slot = s % self.seconds
+            for i, sums in enumerate(self.sums):
+                totals[i] -= sums[slot]
+                sums[slot] = 0.0
+        self.head = second
+
+    def add(self, price, qty, time_ms, is_buyer_maker):
+        """Add one trade (``time_ms`` in epoch milliseconds)."""
+        second = time_ms // 1000
+        self.advance(second)
+        if second <= self.head - self.seconds:
+            return  # older than the window
+        if second < self.first:
+            self.first = second
+        quote = price * qty
+        # The taker sold when the buyer was the maker
+        values = (qty, quote, 0.0, qty, 1) if is_buyer_maker else (qty, quote, qty, 0.0, 1)
+        slot = second % self.seconds
+        totals = self.totals
+        for i, sums in enumerate(self.sums):
+            sums[slot] += values[i]
+            totals[i] += values[i]
+
+    def metrics(self):
+        """Return VWAP, buy/sell volume, buy share, trade rate and average size."""
+        volume, quote, buy, sell, count = self.totals
+        if self.head is None or count < 0.5:
+            return None
+        span = min(self.seconds, self.head - self.first + 1)
+        return {
+            "vwap": quote / volume if volume else 0.0,
+            "buy_volume": buy,
+            "sell_volume": sell,
+            "buy_share": buy / (buy + sell) * 100 if buy + sell else 50.0,
+            "rate": count / span,
+            "avg_size": volume / count,
+        }
+
+
+# Window label -> length in seconds
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class TradeAnalytics:
+    """Rolling order-flow statistics of one symbol over every window in WINDOWS."""
+
+    def __init__(self):
+        self.windows = {label: RollingWindow(seconds) for label, seconds in WINDOWS.items()}
+
+    def add_trade(self, price, qty, time_ms, is_buyer_maker):
+        for window in self.windows.values():
+            window.add(price, qty, time_ms, is_buyer_maker)
+
+    def clear(self):
+        for window in self.windows.values():
+            window.clear()
+
+    @property
+    def nbytes(self):
+        return sum(window.seconds * window.FIELDS * 8 for window in self.windows.values())
+
+    def snapshot(self, now_ms):
+        """Return {window label: metrics or None} as of ``now_ms``."""
+        second = now_ms // 1000
+        result = {}
+        for label, window in self.windows.items():
+            window.advance(second)
+            result[label] = window.metrics()
+        return result
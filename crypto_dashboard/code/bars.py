@@ -0,0 +1,110 @@
+from abc import ABC, abstractmethod
+
+from candles import CandleBuffer
+
+
+class BarBuilder(ABC):
+    """Folds trades into OHLCV bars, one constant-time step per trade."""
+
+    def __init__(self, capacity=2000):
+        self.candles = CandleBuffer(capacity)
+        self.bar = None  # [time, open, high, low, close, volume] of the open bar
+
+    def reset(self):
+        """Drop every bar."""
+        self.candles.clear()
+        self.bar = None
+
+    def _open(self, time, price, qty):
+        self.bar = [time, price, price, price, price, qty]
+        self.candles.append(*self.bar)
+
+    def _extend(self, price, qty):
+        bar = self.bar
+        if price > bar[2]:
+            bar[2] = price
+        elif price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        bar[5] += qty
+        self.candles.update_last(*bar)
+
+    @abstractmethod
+    def add_trade(self, price, qty, time):
+        """Add one trade. Returns True when it opened a new bar."""
+
+
+class TimeBarBuilder(BarBuilder):
+    """Bars covering a fixed number of seconds."""
+
+    def __init__(self, seconds, capacity=2000):
+        super().__init__(capacity)
+        self.interval_ms = int(seconds * 1000)
+
+    def add_trade(self, price, qty, time):
+        bucket = time - time % self.interval_ms
+        if self.bar is None or bucket > self.bar[0]:
+            self._open(bucket, price, qty)
+            return True
+        self._extend(price, qty)
+        return False
+
+
+class TickBarBuilder(BarBuilder):
+    """Bars closing after a fixed number of trades."""
+
+    def __init__(self, trades, capacity=2000):
+        super().__init__(capacity)
+        self.trades = trades
+        self.count = 0
+
+    def reset(self):
+        super().reset()
+        self.count = 0
+
+    def add_trade(self, price, qty, time):
+        if self.bar is None or self.count >= self.trades:
+            self._open(time, price, qty)
+            self.count = 1
+            return True
+        self._extend(price, qty)
+        self.count += 1
+        return False
+
+
+class VolumeBarBuilder(BarBuilder):
+    """Bars closing once traded volume reaches a threshold.
+
+    With ``quote=True`` the threshold is in quote currency (price * qty), so
+    one setting such as $1M works across symbols of very different prices.
+    A trade that crosses the threshold closes the bar it belongs to.
+    """
+
+    def __init__(self, size, quote=False, capacity=2000):
+        super().__init__(capacity)
+        self.size = size
+        self.quote = quote
+        self.filled = 0.0
+
+    def reset(self):
+        super().reset()
+        self.filled = 0.0
+
+    def add_trade(self, price, qty, time):
+        amount = price * qty if self.quote else qty
+        if self.bar is None or self.filled >= self.size:
+            self._open(time, price, qty)
+            self.filled = amount
+            return True
+        self._extend(price, qty)
+        self.filled += amount
+        return False
+
+
+# Trade-built bar types offered by the chart, keyed by selector label
+BAR_TYPES = {
+    "1s": lambda: TimeBarBuilder(1),
+    "5s": lambda: TimeBarBuilder(5),
+    "100t": lambda: TickBarBuilder(100),
+    "$1M": lambda: VolumeBarBuilder(1_000_000, quote=True),
+}
@@ -0,0 +1,392 @@
+"""Headless benchmark of every panel's ingest and render path.
+
+Each panel is driven by a synthetic or recorded message stream through the
+hub, the same path live frames take, while the real RenderScheduler
+repaints it. Run it with a withdrawn Tk root, or under Xvfb with --show
+to include the cost of mapping widgets:
+
+    python benchmark.py --messages 20000 --rate 0 --output bench.json
+    python benchmark.py --log session.jsonl.gz --panels order_book chart
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bootstrap import Bootstrapper
+from scheduler import RenderScheduler
+from symbolcache import SymbolCache
+from klinecache import KlineCache
+from recorder import ReplayHub, ReplayBootstrapper, read_log
+from decoder import Decoder, BACKENDS
+from ticker import CryptoTicker
+from orderbook import OrderBookPanel
+from TradesPanel import TradesPanel
+from CandlestickChart import CandlestickChart
+from PriceTable import PriceTable
+
+# Stream suffix each panel consumes
+PANEL_STREAMS = {
+    "order_book": "depth@100ms",
+    "trades": "trade",
+    "chart": "kline_1m",
+    "price_table": "ticker",
+    "ticker": "ticker",
+}
+
+PROBE_INTERVAL_MS = 50   # how often the Tk queue backlog is sampled
+SNAPSHOT_ID = 1_000_000  # lastUpdateId of the synthetic depth snapshot
+MID_PRICE = 30000.0
+TICK = 0.01
+TRADES_PER_CANDLE = 50   # kline updates before a synthetic candle closes
+
+
+def _create_panel(name, parent, symbol, hub, scheduler, bootstrap):
+    """Build a panel wired to the benchmark hub, scheduler and bootstrapper."""
+    cache = SymbolCache()
+    if name == "order_book":
+        return OrderBookPanel(parent, symbol, hub=hub, scheduler=scheduler,
+                              bootstrap=bootstrap, symbol_cache=cache)
+    if name == "trades":
+        return TradesPanel(parent, symbol, hub=hub, scheduler=scheduler,
+                           bootstrap=bootstrap, symbol_cache=cache)
+    if name == "chart":
+        return CandlestickChart(parent, symbol, hub=hub, scheduler=scheduler,
+                                kline_cache=KlineCache(":memory:"), bootstrap=bootstrap,
+                                symbol_cache=cache)
+    if name == "price_table":
+        return PriceTable(parent, symbol, hub=hub, scheduler=scheduler,
+                          bootstrap=bootstrap, symbol_cache=cache)
+    return CryptoTicker(parent, symbol, symbol.upper(), hub=hub, scheduler=scheduler)
+
+
+class SyntheticBootstrapper(Bootstrapper):
+    """Answers the panels' REST requests with generated data."""
+
+    def __init__(self, start_ms, workers=1):
+        super().__init__(workers)
+        self.start_ms = start_ms
+
+    def get_json(self, path, params=None, timeout=10):
+        params = params or {}
+        if path == "/api/v3/depth":
+            levels = params.get("limit", 1000)
+            return {
+                "lastUpdateId": SNAPSHOT_ID,
+                "bids": [[f"{MID_PRICE - (i + 1) * TICK:.2f}", "1.0"] for i in range(levels)],
+                "asks": [[f"{MID_PRICE + (i + 1) * TICK:.2f}", "1.0"] for i in range(levels)],
+            }
+        if path == "/api/v3/klines":
+            limit = params.get("limit", 1000)
+            first = self.start_ms - limit * 60_000
+            return [[first + i * 60_000, "30000", "30010", "29990", "30005", "12.5",
+                     first + i * 60_000 + 59_999] for i in range(limit)]
+        if path == "/api/v3/ticker/24hr":
+            return {"highPrice": "31000", "lowPrice": "29000", "volume": "12345.6",
+                    "priceChange": "150", "priceChangePercent": "0.5",
+                    "openPrice": "29850", "lastPrice": "30000"}
+        return []
+
+
+def synthetic_frames(name, symbol, count, start_ms, seed=1):
+    """Generate ``count`` combined-stream frames for a panel's stream type."""
+    rng = random.Random(seed)
+    stream = f"{symbol.lower()}@{PANEL_STREAMS[name]}"
+    price = MID_PRICE
+    update_id = SNAPSHOT_ID
+    frames = []
+    for i in range(count):
+        event_ms = start_ms + i
+        price = max(TICK, price + rng.choice((-1, 1)) * TICK * rng.randint(0, 5))
+        if name == "order_book":
+            first = update_id + 1
+            update_id += rng.randint(1, 5)
+            data = {
+                "e": "depthUpdate", "E": event_ms, "s": symbol, "U": first, "u": update_id,
+                "b": [[f"{price - rng.randint(1, 500) * TICK:.2f}",
+                       f"{rng.random() * 2 if rng.random() > 0.2 else 0:.4f}"] for _ in range(10)],
+                "a": [[f"{price + rng.randint(1, 500) * TICK:.2f}",
+                       f"{rng.random() * 2 if rng.random() > 0.2 else 0:.4f}"] for _ in range(10)],
+            }
+        elif name == "trades":
+            data = {"e": "trade", "E": event_ms, "s": symbol, "t": i, "p": f"{price:.2f}",
+                    "q": f"{rng.random():.5f}", "T": event_ms, "m": rng.random() < 0.5}
+        elif name == "chart":
+            candle = i // TRADES_PER_CANDLE
+            open_ms = start_ms + candle * 60_000
+            data = {"e": "kline", "E": event_ms, "s": symbol, "k": {
+                "t": open_ms, "T": open_ms + 59_999, "i": "1m",
+                "o": "30000", "h": f"{max(price, 30000):.2f}", "l": f"{min(price, 30000):.2f}",
+                "c": f"{price:.2f}", "v": f"{(i % TRADES_PER_CANDLE + 1) * 0.1:.2f}",
+                "x": i % TRADES_PER_CANDLE == TRADES_PER_CANDLE - 1}}
+        else:
+            data = {"e": "24hrTicker", "E": event_ms, "s": symbol, "c": f"{price:.2f}",
+                    "o": "29850", "h": "31000", "l": "29000", "v": "12345.6",
+                    "p": f"{price - 29850:.2f}", "P": f"{(price - 29850) / 298.5:.2f}"}
+        frames.append(json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+    return frames
+
+
+def recorded_frames(name, symbol, path, count=None):
+    """Return a panel's frames from a recorded log, optionally the first ``count``."""
+    stream = f"{symbol.lower()}@{PANEL_STREAMS[name]}"
+    frames = []
+    for entry in read_log(path):
+        message = entry.get("ws")
+        if message and json.loads(message).get("stream") == stream:
+            frames.append(message)
+            if count and len(frames) >= count:
+                break
+    return frames
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _peak_rss_mb():
+    """Return the peak resident set size of this process, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _dict_path(message):
+    """Decoding as it was before typed records: json, then float() in handlers."""
+    data = json.loads(message)["data"]
+    if "b" in data:
+        [(float(price), float(qty)) for price, qty in data["b"]]
+        [(float(price), float(qty)) for price, qty in data["a"]]
+    else:
+        float(data["p"])
+        float(data["q"])
+
+
+def _time_per_message(fn, frames):
+    started = time.perf_counter()
+    for message in frames:
+        fn(message)
+    return (time.perf_counter() - started) / len(frames) * 1e6
+
+
+def bench_decoders(symbol, count, start_ms):
+    """Compare decoding cost per message on depth and trade frames, in microseconds."""
+    results = {}
+    for name, label in (("order_book", "depth"), ("trades", "trade")):
+        frames = synthetic_frames(name, symbol, count, start_ms)
+        timings = {"dict_json_us": _time_per_message(_dict_path, frames)}
+        for backend in BACKENDS:
+            timings[f"{backend}_us"] = _time_per_message(Decoder(backend).decode, frames)
+        results[label] = timings
+    return results
+
+
+def run_panel(name, frames, bootstrap, symbol, rate=0, fps=20, show=False, decoder="auto"):
+    """Drive one panel through ``frames`` and return its measurements."""
+    root = tk.Tk()
+    root.geometry("900x600")
+    if not show:
+        root.withdraw()
+    parent = tk.Frame(root, bg="#1e1e1e")
+    parent.pack(fill=tk.BOTH, expand=True)
+
+    hub = ReplayHub(Decoder(decoder))
+    scheduler = RenderScheduler(root, fps=fps)
+    panel = _create_panel(name, parent, symbol, hub, scheduler, bootstrap)
+    panel.pack(fill=tk.BOTH, expand=True)
+
+    # Time every repaint the scheduler makes
+    render_times = []
+    render = scheduler.renderers[panel]
+
+    def timed_render():
+        started = time.perf_counter()
+        render()
+        root.update_idletasks()
+        render_times.append(time.perf_counter() - started)
+    scheduler.register(panel, timed_render)
+
+    # Bootstrap the panel before any frame arrives (the pool has one worker,
+    # so a trailing no-op finishes after everything queued before it)
+    panel.start()
+    scheduler.start()
+    bootstrap.submit(lambda: None).result()
+    root.update()
+    render_times.clear()
+
+    # Decoding cost alone, measured on the same frames
+    started = time.perf_counter()
+    for message in frames:
+        hub.decoder.decode(message)
+    parse_time = time.perf_counter() - started
+
+    # Frames are fed from a worker thread, like a socket thread would
+    ingest = {"time": 0.0, "elapsed": 0.0}
+
+    def produce():
+        started = time.perf_counter()
+        for i, message in enumerate(frames):
+            if rate:
+                delay = i / rate - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            hub._dispatch(message)
+            ingest["time"] += time.perf_counter() - t0
+        ingest["elapsed"] = time.perf_counter() - started
+
+    # Sample how late after() callbacks run while frames stream in
+    lateness = []
+
+    def probe(expected):
+        lateness.append(max(0.0, time.perf_counter() - expected))
+        if producer.is_alive():
+            root.after(PROBE_INTERVAL_MS, probe, time.perf_counter() + PROBE_INTERVAL_MS / 1000)
+        else:
+            # Let the scheduler paint the final state, then stop
+            root.after(scheduler.interval_ms * 2, root.quit)
+
+    producer = threading.Thread(target=produce, name="benchmark-feed", daemon=True)
+    producer.start()
+    root.after(PROBE_INTERVAL_MS, probe, time.perf_counter() + PROBE_INTERVAL_MS / 1000)
+    root.mainloop()
+    producer.join()
+
+    count = len(frames)
+    stats = scheduler.stats()
+    result = {
+        "messages": count,
+        "elapsed_s": ingest["elapsed"],
+        "messages_per_s": count / ingest["elapsed"] if ingest["elapsed"] else 0.0,
+        "parse_us": parse_time / count * 1e6 if count else 0.0,
+        "ingest_us": ingest["time"] / count * 1e6 if count else 0.0,
+        "handler_us": max(0.0, ingest["time"] - parse_time) / count * 1e6 if count else 0.0,
+        "render": {
+            "frames": len(render_times),
+            "mean_ms": sum(render_times) / len(render_times) * 1000 if render_times else 0.0,
+            "p95_ms": _percentile(render_times, 95) * 1000,
+            "max_ms": max(render_times, default=0.0) * 1000,
+        },
+        "backlog": {
+            "mean_ms": sum(lateness) / len(lateness) * 1000 if lateness else 0.0,
+            "max_ms": max(lateness, default=0.0) * 1000,
+        },
+        "coalesced": stats["coalesced"],
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+    panel.stop()
+    scheduler.stop()
+    bootstrap.shutdown()
+    root.destroy()
+    return result
+
+
+def _run_one(name, args):
+    start_ms = int(time.time() * 1000) // 60_000 * 60_000
+    if args.log:
+        frames = recorded_frames(name, args.symbol, args.log, args.messages)
+        bootstrap = ReplayBootstrapper(args.log, workers=1)
+    else:
+        frames = synthetic_frames(name, args.symbol, args.messages, start_ms)
+        bootstrap = SyntheticBootstrapper(start_ms)
+    return run_panel(name, frames, bootstrap, args.symbol,
+                     rate=args.rate, fps=args.fps, show=args.show, decoder=args.decoder)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark panel ingest and render paths")
+    parser.add_argument("--panels", nargs="+", choices=list(PANEL_STREAMS),
+                        default=list(PANEL_STREAMS))
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--messages", type=int, default=10000,
+                        help="synthetic messages per panel (limit when replaying a log)")
+    parser.add_argument("--log", help="recorded .jsonl.gz log to replay instead of synthetic data")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="messages per second; 0 feeds as fast as possible")
+    parser.add_argument("--fps", type=int, default=20)
+    parser.add_argument("--show", action="store_true", help="map the window (use under Xvfb)")
+    parser.add_argument("--decoder", default="auto", choices=["auto", "json", "orjson"],
+                        help="JSON backend of the frame decoder")
+    parser.add_argument("--output", default="benchmark.json", help="result file, or - for stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    if len(args.panels) == 1:
+        results[args.panels[0]] = _run_one(args.panels[0], args)
+    else:
+        # One process per panel so peak RSS and warm caches stay separate
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in args.panels:
+                path = os.path.join(tmp, f"{name}.json")
+                cmd = [sys.executable, os.path.abspath(__file__), "--panels", name,
+                       "--symbol", args.symbol, "--messages", str(args.messages),
+                       "--rate", str(args.rate), "--fps", str(args.fps),
+                       "--decoder", args.decoder, "--output", path]
+                if args.log:
+                    cmd += ["--log", args.log]
+                if args.show:
+                    cmd.append("--show")
+                output = subprocess.run(cmd, capture_output=True, text=True)
+                if output.returncode != 0:
+                    print(f"Benchmark of {name} failed: {output.stderr.strip()}")
+                    continue
+                with open(path) as f:
+                    results[name] = json.load(f)["panels"][name]
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "symbol": args.symbol,
+            "messages": args.messages,
+            "log": args.log,
+            "rate": args.rate,
+            "fps": args.fps,
+            "show": args.show,
+            "decoder": Decoder(args.decoder).backend,
+        },
+        "panels": results,
+        "decoders": bench_decoders(args.symbol, min(args.messages, 20000),
+                                   int(time.time() * 1000)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+        for name, result in results.items():
+            print(f"{name:12} {result['messages_per_s']:>10,.0f} msg/s  "
+                  f"parse {result['parse_us']:6.1f} us  "
+                  f"render {result['render']['mean_ms']:6.2f} ms  "
+                  f"backlog {result['backlog']['max_ms']:6.1f} ms")
+        for label, timings in report["decoders"].items():
+            print(f"decode {label:6} " + "  ".join(f"{key[:-3]} {value:.2f} us"
+                                                   for key, value in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
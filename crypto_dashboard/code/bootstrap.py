@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.binance.com"
+
+
+class Bootstrapper:
+    """Runs REST snapshot and history fetches on a small worker pool.
+
+    All requests share one ``requests.Session`` so connections to the API
+    are kept alive and reused. Panels submit a function together with a
+    generation number and drop the result if their symbol changed while
+    the request was in flight.
+    """
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="bootstrap")
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.recorder = None  # FeedRecorder logging every response
+
+    def get_json(self, path, params=None, timeout=10):
+        """GET an API path and return the decoded JSON body."""
+        response = self.session.get(API_URL + path, params=params, timeout=timeout)
+        response.raise_for_status()
+        body = response.json()
+        if self.recorder:
+            self.recorder.record_rest(path, params, body)
+        return body
+
+    def submit(self, fn, *args):
+        """Run ``fn(*args)`` on the pool and return its future."""
+        return self.executor.submit(self._run, fn, *args)
+
+    def _run(self, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"Bootstrap error in {fn.__name__}: {e}")
+
+    def shutdown(self):
+        """Cancel queued work and stop the pool."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_shared_bootstrapper = None
+
+
+def get_bootstrapper():
+    """Return the process-wide bootstrapper, creating it on first use."""
+    global _shared_bootstrapper
+    if _shared_bootstrapper is None:
+        _shared_bootstrapper = Bootstrapper()
+    return _shared_bootstrapper
@@ -0,0 +1,94 @@
+import numpy as np
+
+CANDLE_DTYPE = np.dtype([
+    ('time', 'i8'),      # open time, epoch milliseconds
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+])
+
+
+class CandleBuffer:
+    """Fixed-capacity ring buffer of OHLCV candles in a structured array.
+
+    Every row is written twice, at ``i`` and ``i + capacity``, so the newest
+    ``n`` rows always form one contiguous slice and ``last(n)`` returns a
+    view instead of a copy.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.data = np.zeros(capacity * 2, dtype=CANDLE_DTYPE)
+        self.count = 0  # rows appended since the last clear
+        self.size = 0   # rows held, at most ``capacity``
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        """Drop every candle."""
+        self.count = 0
+        self.size = 0
+
+    def append(self, time, open_, high, low, close, volume):
+        """Append a new candle, overwriting the oldest when full."""
+        i = self.count % self.capacity
+        row = (time, open_, high, low, close, volume)
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+        self.count += 1
+        if self.size < self.capacity:
+            self.size += 1
+
+    def drop_newest(self, n):
+        """Remove the newest ``n`` candles."""
+        n = min(n, self.size)
+        self.count -= n
+        self.size -= n
+
+    def count_since(self, time):
+        """Return how many of the newest candles open at or after ``time``."""
+        times = self.last()['time']
+        return len(times) - int(np.searchsorted(times, time))
+
+    def update_last(self, time, open_, high, low, close, volume):
+        """Overwrite the newest candle in place."""
+        i = (self.count - 1) % self.capacity
+        row = (time, open_, high, low, close, volume)
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+
+    def upsert(self, time, open_, high, low, close, volume):
+        """Update the newest candle if it has the same open time, else append.
+
+        Returns True when a new candle was appended.
+        """
+        if self.size and self.last_time() == time:
+            self.update_last(time, open_, high, low, close, volume)
+            return False
+        self.append(time, open_, high, low, close, volume)
+        return True
+
+    def extend(self, rows):
+        """Append (time, open, high, low, close, volume) tuples in order."""
+        for row in rows:
+            self.append(*row)
+
+    def last_time(self):
+        """Return the open time of the newest candle, or None when empty."""
+        if not self.size:
+            return None
+        return int(self.data['time'][(self.count - 1) % self.capacity])
+
+    def last(self, n=None):
+        """Return a view of the newest ``n`` candles, oldest first."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return self.data[end - n:end]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
@@ -0,0 +1,145 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class CanvasTable:
+    """Virtualized table drawn as text items on a single canvas.
+
+    ``columns`` lists (title, width in characters, colour); text is right
+    aligned in each column. ``length()`` returns the number of rows and
+    ``rows(start, n)`` the rows in [start, start + n), each a tuple with
+    one cell per column. A cell is its text, or a (text, colour) pair.
+
+    Only the rows that fit on screen exist as canvas items. Scrolling and
+    refreshing reuse them, and an item is reconfigured only when its text
+    or colour changed. With ``stick="bottom"`` the last row stays in view
+    and scrolling moves away from the end instead of the start.
+    """
+
+    def __init__(self, parent, columns, length, rows, height=15, header=True,
+                 stick="top", font=("Consolas", 9), bg="#1e1e1e"):
+        self.columns = columns
+        self.length = length
+        self.rows = rows
+        self.header = header
+        self.stick = stick
+        self.font = font
+        self.scroll = 0  # rows scrolled away from the sticky edge
+
+        metrics = tkfont.Font(font=font)
+        self.row_height = metrics.metrics("linespace") + 1
+        char_width = metrics.measure("0")
+
+        # Right edge of each column
+        self.edges = []
+        x = 0
+        for title, width, color in columns:
+            x += width * char_width
+            self.edges.append(x)
+        self.header_height = self.row_height + 4 if header else 0
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, width=x + 4, bg=bg, highlightthickness=0,
+                                height=self.header_height + height * self.row_height)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        if header:
+            for (title, width, color), edge in zip(columns, self.edges):
+                self.canvas.create_text(edge, 2, text=title, anchor="ne", fill="#888888",
+                                        font=("Segoe UI", 9, "bold"))
+
+        # Recycled row items: one list of item ids per visible row, and
+        # the cell each item currently shows
+        self.items = []
+        self.shown = []
+        self.visible = 0
+        self._resize(height)
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_height(self, rows):
+        """Request room for ``rows`` rows."""
+        self.canvas.config(height=self.header_height + rows * self.row_height)
+
+    def _resize(self, visible):
+        """Create or delete row items so exactly ``visible`` rows exist."""
+        visible = max(0, visible)
+        while len(self.items) < visible:
+            y = self.header_height + len(self.items) * self.row_height
+            self.items.append([
+                self.canvas.create_text(edge, y, text="", anchor="ne", fill=color, font=self.font)
+                for (title, width, color), edge in zip(self.columns, self.edges)
+            ])
+            self.shown.append([""] * len(self.columns))
+        while len(self.items) > visible:
+            for item in self.items.pop():
+                self.canvas.delete(item)
+            self.shown.pop()
+        self.visible = visible
+
+    def _on_configure(self, event):
+        visible = (event.height - self.header_height) // self.row_height
+        if visible != self.visible:
+            self._resize(visible)
+            self.refresh()
+
+    def _on_wheel(self, event):
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+
+    def _first(self, count):
+        """Index of the first visible row."""
+        if self.stick == "bottom":
+            return max(0, count - self.visible - self.scroll)
+        return self.scroll
+
+    def yview(self, *args):
+        """Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")."""
+        count = self.length()
+        limit = max(0, count - self.visible)
+        if not args:
+            return
+        if args[0] == "moveto":
+            first = round(float(args[1]) * count)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            first = self._first(count) + step
+        else:
+            return
+        first = min(max(first, 0), limit)
+        self.scroll = limit - first if self.stick == "bottom" else first
+        self.refresh()
+
+    def refresh(self):
+        """Repaint visible rows, touching only the items that changed."""
+        count = self.length()
+        limit = max(0, count - self.visible)
+        self.scroll = min(self.scroll, limit)
+        first = self._first(count)
+        rows = self.rows(first, self.visible) if self.visible else []
+
+        itemconfig = self.canvas.itemconfig
+        for i, items in enumerate(self.items):
+            shown = self.shown[i]
+            row = rows[i] if i < len(rows) else None
+            for j, item in enumerate(items):
+                cell = row[j] if row is not None else ""
+                if cell == shown[j]:
+                    continue
+                if isinstance(cell, tuple):
+                    itemconfig(item, text=cell[0], fill=cell[1])
+                else:
+                    itemconfig(item, text=cell, fill=self.columns[j][2])
+                shown[j] = cell
+
+        if count:
+            self.scrollbar.set(first / count, min(1.0, (first + self.visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
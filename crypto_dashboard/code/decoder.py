@@ -0,0 +1,158 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON backends by name; orjson is used when installed
+BACKENDS = {"json": json.loads}
+if orjson is not None:
+    BACKENDS["orjson"] = orjson.loads
+
+
+class DepthUpdate:
+    """Diff-depth event with bids and asks as (price, qty) float tuples."""
+    __slots__ = ("symbol", "event_time", "first_id", "last_id", "bids", "asks")
+
+    def __init__(self, symbol, event_time, first_id, last_id, bids, asks):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.first_id = first_id
+        self.last_id = last_id
+        self.bids = bids
+        self.asks = asks
+
+
+class Trade:
+    """A trade, or an aggregate trade whose ``fills`` counts the trades in it."""
+    __slots__ = ("symbol", "event_time", "trade_id", "price", "qty", "time", "is_buyer_maker",
+                 "fills")
+
+    def __init__(self, symbol, event_time, trade_id, price, qty, time, is_buyer_maker, fills=1):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.trade_id = trade_id
+        self.price = price
+        self.qty = qty
+        self.time = time
+        self.is_buyer_maker = is_buyer_maker
+        self.fills = fills
+
+
+class Kline:
+    __slots__ = ("symbol", "event_time", "open_time", "open", "high", "low", "close",
+                 "volume", "closed")
+
+    def __init__(self, symbol, event_time, open_time, open, high, low, close, volume, closed):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.open_time = open_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.closed = closed
+
+    def row(self):
+        """Return the (time, open, high, low, close, volume) candle tuple."""
+        return (self.open_time, self.open, self.high, self.low, self.close, self.volume)
+
+
+class Ticker:
+    """24h rolling statistics of one symbol."""
+    __slots__ = ("symbol", "event_time", "last", "open", "high", "low", "volume",
+                 "change", "change_pct")
+
+    def __init__(self, symbol, event_time, last, open, high, low, volume, change, change_pct):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.last = last
+        self.open = open
+        self.high = high
+        self.low = low
+        self.volume = volume
+        self.change = change
+        self.change_pct = change_pct
+
+
+def _levels(levels):
+    return [(float(price), float(qty)) for price, qty in levels]
+
+
+def _depth(data):
+    return DepthUpdate(data['s'], data['E'], data['U'], data['u'],
+                       _levels(data['b']), _levels(data['a']))
+
+
+def _trade(data):
+    return Trade(data['s'], data['E'], data['t'], float(data['p']), float(data['q']),
+                 data['T'], data['m'])
+
+
+def _agg_trade(data):
+    return Trade(data['s'], data['E'], data['a'], float(data['p']), float(data['q']),
+                 data['T'], data['m'], data['l'] - data['f'] + 1)
+
+
+def _kline(data):
+    k = data['k']
+    return Kline(data['s'], data['E'], k['t'], float(k['o']), float(k['h']), float(k['l']),
+                 float(k['c']), float(k['v']), k['x'])
+
+
+def _ticker(data):
+    return Ticker(data['s'], data['E'], float(data['c']), float(data['o']), float(data['h']),
+                  float(data['l']), float(data['v']), float(data['p']), float(data['P']))
+
+
+def _raw(data):
+    return data
+
+
+def _converter_for(stream):
+    """Pick the record converter from a stream name's type suffix."""
+    kind = stream.partition("@")[2]
+    if kind.startswith("depth"):
+        return _depth
+    if kind == "trade":
+        return _trade
+    if kind == "aggTrade":
+        return _agg_trade
+    if kind.startswith("kline_"):
+        return _kline
+    if kind == "ticker":
+        return _ticker
+    return _raw
+
+
+class Decoder:
+    """Decodes combined-stream frames into typed records.
+
+    Prices and quantities are converted to floats once here, and only the
+    fields the panels read are kept. Streams without a record type are
+    passed through as dicts. ``backend`` is "auto", "json" or "orjson".
+    """
+
+    def __init__(self, backend="auto"):
+        if backend == "auto":
+            backend = "orjson" if "orjson" in BACKENDS else "json"
+        if backend not in BACKENDS:
+            print(f"Decoder backend {backend} not available, using json")
+            backend = "json"
+        self.backend = backend
+        self.loads = BACKENDS[backend]
+        self.converters = {}
+
+    def decode(self, message):
+        """Return (stream, record) for a frame, or (None, reply) for control replies."""
+        data = self.loads(message)
+        stream = data.get("stream")
+        if stream is None:
+            return None, data
+
+        converter = self.converters.get(stream)
+        if converter is None:
+            converter = self.converters[stream] = _converter_for(stream)
+        return stream, converter(data["data"])
@@ -0,0 +1,165 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class BookSide:
+    """One side of the book: price -> quantity with prices kept sorted."""
+
+    def __init__(self, descending):
+        self.descending = descending
+        self.levels = {}
+        # Keys are stored negated for bids so both sides sort ascending
+        self.keys = []
+
+    def clear(self):
+        self.levels = {}
+        self.keys = []
+
+    def set(self, price, qty):
+        """Insert, update or (qty == 0) remove a price level."""
+        key = -price if self.descending else price
+        if qty == 0:
+            if self.levels.pop(price, None) is not None:
+                i = bisect_left(self.keys, key)
+                if i < len(self.keys) and self.keys[i] == key:
+                    del self.keys[i]
+        else:
+            if price not in self.levels:
+                insort(self.keys, key)
+            self.levels[price] = qty
+
+    def top(self, n):
+        """Return the best ``n`` levels as (price, qty) tuples."""
+        levels = self.levels
+        if self.descending:
+            return [(-k, levels[-k]) for k in self.keys[:n]]
+        return [(k, levels[k]) for k in self.keys[:n]]
+
+    def best(self):
+        if not self.keys:
+            return None
+        return -self.keys[0] if self.descending else self.keys[0]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class DepthBook:
+    """Local order book maintained from a REST snapshot plus diff events.
+
+    Follows Binance's procedure for a local book: diff events are buffered
+    until a snapshot is loaded, events older than the snapshot are dropped,
+    and every later event must continue exactly where the previous one
+    ended (``U == previous u + 1``). Any gap marks the book out of sync so
+    the owner can fetch a fresh snapshot; the last levels stay readable
+    until it arrives instead of leaving an empty book on screen.
+
+    At most MAX_BUFFER events are buffered while out of sync; older ones
+    are dropped, which only means a snapshot fetched before them is
+    rejected and refetched.
+    """
+
+    MAX_BUFFER = 1000  # 100 s of 100ms diffs
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = 0
+        self.is_synced = False
+        self.buffer = []
+
+    def reset(self):
+        """Drop all levels and wait for a new snapshot."""
+        with self.lock:
+            self._reset_locked()
+            self.buffer = []
+
+    def _reset_locked(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = 0
+        self.is_synced = False
+
+    def load_snapshot(self, snapshot):
+        """Load a REST depth snapshot and replay buffered diffs.
+
+        Returns False when the snapshot is older than the buffered events
+        and a newer one has to be fetched.
+        """
+        with self.lock:
+            self._reset_locked()
+            for price, qty in snapshot['bids']:
+                self.bids.set(float(price), float(qty))
+            for price, qty in snapshot['asks']:
+                self.asks.set(float(price), float(qty))
+            self.last_update_id = snapshot['lastUpdateId']
+
+            buffered = [e for e in self.buffer if e.last_id > self.last_update_id]
+            if buffered and buffered[0].first_id > self.last_update_id + 1:
+                # The snapshot is older than the buffer; keep it for the next one
+                self.buffer = buffered
+                return False
+            self.buffer = []
+
+            self.is_synced = True
+            for event in buffered:
+                if not self._apply_locked(event):
+                    return False
+            return True
+
+    def apply_diff(self, event):
+        """Apply one diff-depth event (a ``decoder.DepthUpdate``).
+
+        Returns False when a sequence gap was found; the book is then out of
+        sync and buffers events until ``load_snapshot`` is called again.
+        """
+        with self.lock:
+            if not self.is_synced:
+                buffer = self.buffer
+                buffer.append(event)
+                if len(buffer) > self.MAX_BUFFER:
+                    del buffer[0]
+                return True
+            return self._apply_locked(event)
+
+    def _apply_locked(self, event):
+        first_id = event.first_id
+        final_id = event.last_id
+
+        if final_id <= self.last_update_id:
+            # Already contained in the snapshot
+            return True
+        if first_id > self.last_update_id + 1:
+            # Keep the stale levels; load_snapshot replaces them
+            self.is_synced = False
+            self.buffer = [event]
+            return False
+
+        # Levels arrive as floats already, parsed once by the decoder
+        for price, qty in event.bids:
+            self.bids.set(price, qty)
+        for price, qty in event.asks:
+            self.asks.set(price, qty)
+        self.last_update_id = final_id
+        return True
+
+    def top(self, n):
+        """Return the best ``n`` bids and asks as (price, qty) lists."""
+        with self.lock:
+            return self.bids.top(n), self.asks.top(n)
+
+    def snapshot(self, n):
+        """Return the best ``n`` levels as a REST-style depth snapshot, or None when out of sync."""
+        with self.lock:
+            if not self.is_synced:
+                return None
+            return {
+                "lastUpdateId": self.last_update_id,
+                "bids": self.bids.top(n),
+                "asks": self.asks.top(n)
+            }
+
+    def depth(self):
+        """Return the number of price levels held on each side."""
+        return len(self.bids), len(self.asks)
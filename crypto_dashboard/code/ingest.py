@@ -0,0 +1,257 @@
+import marshal
+import multiprocessing
+import struct
+from operator import attrgetter
+import threading
+from multiprocessing import shared_memory
+
+from streams import StreamHub
+from decoder import Decoder, DepthUpdate, Trade, Kline, Ticker
+
+# Record classes by wire code; 0 marks a payload passed through as a dict
+# and RESYNC a reconnect in the ingest process
+RECORD_TYPES = (None, DepthUpdate, Trade, Kline, Ticker)
+RESYNC = -1
+RECORD_CODES = {cls: code for code, cls in enumerate(RECORD_TYPES) if cls}
+RECORD_FIELDS = {cls: attrgetter(*cls.__slots__) for cls in RECORD_CODES}
+
+
+class SharedRing:
+    """Single-producer, single-consumer byte ring in shared memory.
+
+    The first 64 bytes hold the total bytes written, the total read and the
+    messages dropped because the ring was full (each side only ever stores
+    its own counters); messages follow as a 4-byte length
+    and the payload. A message that does not fit before the end of the
+    buffer is preceded by a wrap marker and starts again at offset 0.
+    """
+
+    HEADER = 64
+    WRAP = 0xFFFFFFFF
+
+    def __init__(self, name=None, size=8 * 1024 * 1024):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER + size)
+            self.shm.buf[:self.HEADER] = bytes(self.HEADER)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.size = len(self.buf) - self.HEADER
+
+    def _counter(self, offset):
+        return struct.unpack_from("<Q", self.buf, offset)[0]
+
+    @property
+    def dropped(self):
+        return self._counter(16)
+
+    def write(self, data):
+        """Append one message; returns False (and counts a drop) when full."""
+        need = 4 + len(data)
+        written = self._counter(0)
+        pos = written % self.size
+        tail = self.size - pos
+        skip = tail if tail < need else 0
+        if need + skip > self.size - (written - self._counter(8)):
+            struct.pack_into("<Q", self.buf, 16, self._counter(16) + 1)
+            return False
+        if skip:
+            if tail >= 4:
+                struct.pack_into("<I", self.buf, self.HEADER + pos, self.WRAP)
+            written += skip
+            pos = 0
+        start = self.HEADER + pos
+        struct.pack_into("<I", self.buf, start, len(data))
+        self.buf[start + 4:start + need] = data
+        # Publish only after the payload is in place
+        struct.pack_into("<Q", self.buf, 0, written + need)
+        return True
+
+    def read(self):
+        """Yield every message written so far, as memoryviews into the ring.
+
+        Each view is only valid until the next one is requested.
+        """
+        read = self._counter(8)
+        written = self._counter(0)
+        while read < written:
+            pos = read % self.size
+            tail = self.size - pos
+            length = self.WRAP
+            if tail >= 4:
+                length = struct.unpack_from("<I", self.buf, self.HEADER + pos)[0]
+            if length == self.WRAP:
+                read += tail
+                continue
+            start = self.HEADER + pos + 4
+            view = self.buf[start:start + length]
+            yield view
+            view.release()
+            read += 4 + length
+            struct.pack_into("<Q", self.buf, 8, read)
+        struct.pack_into("<Q", self.buf, 8, read)
+
+    def close(self):
+        self.buf.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _WorkerHub(StreamHub):
+    """Hub in the ingest process: decoded records go into the ring."""
+
+    def __init__(self, ring, wake, decoder, raw):
+        super().__init__(decoder)
+        self.ring = ring
+        self.wake = wake
+        self.raw = raw
+        # The ring has one producer, but every connection (and both sides of
+        # a rollover) delivers on its own socket thread
+        self.write_lock = threading.Lock()
+        self.add_resync_listener(self._forward_resync)
+
+    def _forward_resync(self, streams):
+        data = marshal.dumps((None, RESYNC, sorted(streams), 0.0, 0.0, None))
+        with self.write_lock:
+            written = self.ring.write(data)
+        if written:
+            self.wake.set()
+
+    def _deliver(self, stream, payload, received, parsed, message=None):
+        code = RECORD_CODES.get(type(payload), 0)
+        values = RECORD_FIELDS[type(payload)](payload) if code else payload
+        data = marshal.dumps((stream, code, values, received, parsed,
+                              message if self.raw else None))
+        with self.write_lock:
+            written = self.ring.write(data)
+        if written:
+            self.wake.set()
+        elif self.ring.dropped % 1000 == 1:
+            print(f"Ingest ring full, {self.ring.dropped} frames dropped")
+
+
+def _noop(payload):
+    pass
+
+
+def _ingest_main(commands, ring_name, wake, backend, raw):
+    """Entry point of the ingest process: follow subscribe commands until stopped."""
+    ring = SharedRing(ring_name)
+    hub = _WorkerHub(ring, wake, Decoder(backend), raw)
+    while True:
+        command, stream = commands.get()
+        if command == "subscribe":
+            hub.subscribe(stream, _noop)
+        elif command == "unsubscribe":
+            hub.unsubscribe(stream, _noop)
+        else:
+            break
+    hub.close()
+    ring.close()
+
+
+class IngestHub(StreamHub):
+    """Hub whose WebSocket I/O and decoding run in a separate process.
+
+    The ingest process owns the exchange connections and decodes every
+    frame; records come back through a SharedRing and are handed to the
+    panels' callbacks by one reader thread here, so socket work and JSON
+    parsing no longer compete with Tk and matplotlib for this process's
+    interpreter lock. The process starts with the first subscription.
+    """
+
+    def __init__(self, decoder=None, ring_size=8 * 1024 * 1024):
+        super().__init__(decoder)
+        self.ring = SharedRing(size=ring_size)
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.wake = context.Event()
+        self.context = context
+        self.process = None
+        self.reader = None
+        self.bad_records = 0
+
+    def _start(self):
+        """Start the ingest process and the reader (hub lock held)."""
+        self.process = self.context.Process(
+            target=_ingest_main, name="ingest", daemon=True,
+            args=(self.commands, self.ring.name, self.wake, self.decoder.backend,
+                  self.recorder is not None))
+        self.process.start()
+        self.reader = threading.Thread(target=self._read_loop, name="ingest-reader", daemon=True)
+        self.reader.start()
+
+    def subscribe(self, stream, callback):
+        with self.lock:
+            if self.is_closed:
+                return
+            callbacks = self.callbacks.get(stream, ())
+            if callback in callbacks:
+                return
+            self.callbacks[stream] = callbacks + (callback,)
+            if not callbacks:
+                if self.process is None:
+                    self._start()
+                self.commands.put(("subscribe", stream))
+
+    def unsubscribe(self, stream, callback):
+        with self.lock:
+            callbacks = tuple(cb for cb in self.callbacks.get(stream, ()) if cb != callback)
+            if callbacks:
+                self.callbacks[stream] = callbacks
+            elif self.callbacks.pop(stream, None) and not self.is_closed:
+                self.commands.put(("unsubscribe", stream))
+
+    def _read_loop(self):
+        loads = marshal.loads
+        while not self.is_closed:
+            self.wake.wait(0.05)
+            self.wake.clear()
+            for data in self.ring.read():
+                try:
+                    stream, code, values, received, parsed, message = loads(data)
+                    if code == RESYNC:
+                        self._resync(set(values))
+                        continue
+                    payload = RECORD_TYPES[code](*values) if code else values
+                except (ValueError, EOFError, TypeError, IndexError) as e:
+                    # Skip it rather than lose the reader and freeze every panel
+                    self.bad_records += 1
+                    if self.bad_records % 1000 == 1:
+                        print(f"Error reading ingest record ({self.bad_records} skipped): {e}")
+                    continue
+                if message is not None and self.recorder:
+                    self.recorder.record_frame(message)
+                self._deliver(stream, payload, received, parsed, message)
+
+            if self.failure is None and not self.process.is_alive() and not self.is_closed:
+                self.failure = f"Ingest process exited with code {self.process.exitcode}"
+                print(f"Error: {self.failure}; market data stopped")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "connections": 1 if self.process and self.process.is_alive() else 0,
+                "streams": len(self.callbacks),
+                "callbacks": sum(len(cbs) for cbs in self.callbacks.values()),
+                "dropped": self.ring.dropped,
+                "bad_records": self.bad_records
+            }
+
+    def close(self):
+        with self.lock:
+            self.is_closed = True
+            self.callbacks = {}
+            if self.process is not None:
+                self.commands.put(("stop", None))
+        if self.process is not None:
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.reader is not None:
+            self.reader.join(1)
+        self.ring.close()
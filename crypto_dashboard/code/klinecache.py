@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+
+CACHE_FILE = "kline_cache.db"
+
+
+class KlineCache:
+    """SQLite store of closed klines keyed by symbol and interval."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                PRIMARY KEY (symbol, interval, time)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def load(self, symbol, interval, limit):
+        """Return the newest ``limit`` klines as tuples, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT time, open, high, low, close, volume FROM klines "
+                "WHERE symbol = ? AND interval = ? ORDER BY time DESC LIMIT ?",
+                (symbol, interval, limit)
+            ).fetchall()
+        rows.reverse()
+        return rows
+
+    def store(self, symbol, interval, rows):
+        """Insert or replace (time, open, high, low, close, volume) tuples."""
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, interval) + tuple(row) for row in rows]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_shared_cache = None
+
+
+def get_kline_cache():
+    """Return the process-wide kline cache, opening it on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = KlineCache()
+    return _shared_cache
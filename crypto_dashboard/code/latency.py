@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+def _percentiles(samples):
+    """Return count and p50/p95/p99 of a sample window, in milliseconds."""
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "count": len(ordered),
+        "p50": ordered[int(last * 0.50)],
+        "p95": ordered[int(last * 0.95)],
+        "p99": ordered[int(last * 0.99)],
+    }
+
+
+class LatencyTracker:
+    """Rolling end-to-end latency from exchange event time to paint.
+
+    The hub stamps each frame with its socket receive time and the time
+    decoding finished. The exchange event time (the record's
+    ``event_time``, ``E`` in the raw payload) is shifted onto the local clock with the offset estimated
+    from ``/api/v3/time``. Per stream the tracker keeps ``network``
+    (exchange to receive) and ``parse`` (receive to decoded) samples. Per
+    panel it keeps ``paint``: the age of the newest painted message when
+    its render callback finished. Every series is a window of the most
+    recent ``window`` samples, in milliseconds.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.streams = {}       # stream -> {"network": deque, "parse": deque}
+        self.panels = {}        # panel name -> deque of paint latencies
+        self.clock_offset_ms = 0.0  # exchange clock minus local clock
+        self.clock_rtt_ms = None
+        self.context = threading.local()
+
+    def sync_clock(self, bootstrap):
+        """Estimate the exchange clock offset from one server time request."""
+        sent = time.time() * 1000
+        data = bootstrap.get_json("/api/v3/time", timeout=5)
+        received = time.time() * 1000
+        self.clock_rtt_ms = received - sent
+        self.clock_offset_ms = data["serverTime"] - (sent + received) / 2
+
+    def _series(self, table, key, factory):
+        series = table.get(key)
+        if series is None:
+            series = table[key] = factory()
+        return series
+
+    def stamp_frame(self, stream, payload, received, parsed):
+        """Stamp one decoded frame; returns its event time on the local clock."""
+        if isinstance(payload, dict):
+            event_ms = payload.get("E") or payload.get("T")
+        else:
+            event_ms = getattr(payload, "event_time", None)
+        if event_ms is None:
+            return None
+        local_event = event_ms - self.clock_offset_ms
+        with self.lock:
+            series = self._series(self.streams, stream, lambda: {
+                "network": deque(maxlen=self.window),
+                "parse": deque(maxlen=self.window),
+            })
+            series["network"].append(received * 1000 - local_event)
+            series["parse"].append((parsed - received) * 1000)
+        return local_event
+
+    def begin(self, local_event):
+        """Mark the frame being dispatched on this thread."""
+        self.context.event = local_event
+
+    def end(self):
+        self.context.event = None
+
+    def current(self):
+        """Return the local event time of the frame dispatched on this thread."""
+        return getattr(self.context, "event", None)
+
+    def record_paint(self, panel, local_event):
+        """Record how old the newest message shown by ``panel`` is, now."""
+        age = time.time() * 1000 - local_event
+        with self.lock:
+            self._series(self.panels, panel, lambda: deque(maxlen=self.window)).append(age)
+
+    def snapshot(self):
+        """Return p50/p95/p99 per stream and panel plus the clock estimate."""
+        with self.lock:
+            streams = {name: {kind: list(samples) for kind, samples in series.items()}
+                       for name, series in self.streams.items()}
+            panels = {name: list(samples) for name, samples in self.panels.items()}
+        return {
+            "time": time.time(),
+            "clock_offset_ms": self.clock_offset_ms,
+            "clock_rtt_ms": self.clock_rtt_ms,
+            "streams": {name: {kind: _percentiles(samples) for kind, samples in series.items()}
+                        for name, series in streams.items()},
+            "panels": {name: {"paint": _percentiles(samples)} for name, samples in panels.items()},
+        }
+
+    def summary(self):
+        """Return one line for the status bar."""
+        with self.lock:
+            network = [v for s in self.streams.values() for v in s["network"]]
+            paint = [v for samples in self.panels.values() for v in samples]
+        network = _percentiles(network)
+        paint = _percentiles(paint)
+        return (f"Latency p50/p95/p99  network {network['p50']:.0f}/{network['p95']:.0f}/"
+                f"{network['p99']:.0f} ms  |  to paint {paint['p50']:.0f}/{paint['p95']:.0f}/"
+                f"{paint['p99']:.0f} ms  |  clock offset {self.clock_offset_ms:+.0f} ms")
+
+    def export(self, path):
+        """Write the current snapshot as JSON, replacing the file atomically."""
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp, path)
@@ -1,14 +1,67 @@
-import tkinter as tk
-from tkinter import ttk
-from CryptoDashboard import CryptoDashboard
+import argparse
+import time
+
+LAUNCHED = time.perf_counter()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crypto Dashboard")
+    parser.add_argument("--record", metavar="LOG",
+                        help="append every raw frame and REST response to a .jsonl.gz log")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="run offline from a recorded log instead of Binance")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed multiplier; 0 replays as fast as possible")
+    parser.add_argument("--latency-export", metavar="FILE",
+                        help="write latency percentiles as JSON to FILE every second")
+    parser.add_argument("--ingest-process", action="store_true", default=None,
+                        help="read and decode the exchange streams in a separate process")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print import, widget-build and first-data timings once data is shown")
+    parser.add_argument("--server", action="store_true",
+                        help="run only the headless market data server for other dashboards")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address the server listens on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="port the server listens on (default 8765)")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="take market data from a running server instead of Binance")
+    return parser.parse_args()
+
+def run_server(args):
+    # No Tk here: the server can run on a machine without a display
+    from server import MarketDataServer
+
+    server = MarketDataServer(args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
 
 def main():
+    args = parse_args()
+    if args.server:
+        run_server(args)
+        return
+
+    from startup import StartupTimer
+    startup = StartupTimer(LAUNCHED) if args.startup_report else None
+
+    import tkinter as tk
+    from tkinter import ttk
+    from CryptoDashboard import CryptoDashboard
+    if startup:
+        startup.mark("imports")
+
     root = tk.Tk()
 
     style = ttk.Style()
     style.theme_use("clam")
 
-    app = CryptoDashboard(root)
+    app = CryptoDashboard(root, record=args.record, replay=args.replay, speed=args.speed,
+                          latency_export=args.latency_export, connect=args.connect,
+                          ingest_process=args.ingest_process, startup=startup)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
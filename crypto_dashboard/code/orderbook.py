@@ -1,28 +1,44 @@
 import tkinter as tk
-from tkinter import ttk
-import websocket
-import json
-import threading
-import requests
-from datetime import datetime
-from collections import deque
-import os
-
-# For candlestick chart
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-import numpy as np
+import time
+
+from streams import get_hub, Backoff
+from scheduler import get_scheduler
+from depthbook import DepthBook
+from bootstrap import get_bootstrapper
+from symbolcache import get_symbol_cache
+from symbols import get_symbol_universe
+from canvastable import CanvasTable
 
 class OrderBookPanel:
     """Panel showing order book (bids and asks)."""
 
-    def __init__(self, parent, symbol="BTCUSDT"):
+    DEPTH_OPTIONS = (10, 20, 50, 100, 250, 500)
+    VISIBLE_LEVELS = 15  # rows per side before the tables scroll
+    SNAPSHOT_LIMIT = 1000
+    RESYNC_ATTEMPTS = 3
+
+    def __init__(self, parent, symbol="BTCUSDT", hub=None, scheduler=None, levels=10,
+                 bootstrap=None, symbol_cache=None, symbols=None):
         self.parent = parent
         self.symbol = symbol
         self.is_active = False
-        self.ws = None
+        self.hub = hub or get_hub()
+        self.levels = levels
+        self.bootstrap = bootstrap or get_bootstrapper()
+        self.cache = symbol_cache or get_symbol_cache()
+        self.symbols = symbols or get_symbol_universe()
+        self.info = self.symbols.get(symbol)  # formatters of the shown symbol
+
+        # Per-symbol stream bookkeeping; cached symbols stay subscribed
+        self.streams = {}
+        self.resyncing = {}  # symbol -> token of the resync that owns it
+        self.backoffs = {}   # symbol -> Backoff after snapshot rounds that failed
+        self.retry_at = {}   # symbol -> monotonic time before which no resync starts
+        self.pending = {}
+        self.cache.add_evict_listener(self._on_evict)
+        self.book = self._book_for(symbol)
+        self.scheduler = scheduler or get_scheduler(parent)
+        self.scheduler.register(self, self._update_display)
         self.is_visible = True
 
         # Main frame
@@ -40,24 +56,34 @@ class OrderBookPanel:
             fg="#ffffff"
         ).pack(side=tk.LEFT)
 
+        # Depth selector
+        self.depth_var = tk.IntVar(value=levels)
+        depth_menu = tk.OptionMenu(title_frame, self.depth_var, *self.DEPTH_OPTIONS,
+                                   command=self.set_depth)
+        depth_menu.config(font=("Segoe UI", 9), bg="#2d2d2d", fg="#ffffff",
+                          activebackground="#444444", relief="flat", highlightthickness=0)
+        depth_menu.pack(side=tk.RIGHT)
+
+        tk.Label(title_frame, text="Levels:", font=("Segoe UI", 9),
+                 bg="#1e1e1e", fg="#888888").pack(side=tk.RIGHT, padx=5)
+
         # Create order book display
         book_frame = tk.Frame(self.frame, bg="#1e1e1e")
         book_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        # Headers
-        header_frame = tk.Frame(book_frame, bg="#1e1e1e")
-        header_frame.pack(fill=tk.X)
-
-        tk.Label(header_frame, text="Price", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=12, anchor="e").pack(side=tk.LEFT)
-        tk.Label(header_frame, text="Amount", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=12, anchor="e").pack(side=tk.LEFT)
-        tk.Label(header_frame, text="Total", font=("Segoe UI", 9, "bold"),
-                 bg="#1e1e1e", fg="#888888", width=12, anchor="e").pack(side=tk.LEFT)
-
-        # Asks (sells) - shown in red, reversed order
-        self.asks_frame = tk.Frame(book_frame, bg="#1e1e1e")
-        self.asks_frame.pack(fill=tk.X, pady=(5, 0))
+        # Levels of the last paint; the tables format only the rows in view
+        self.asks = []
+        self.bids = []
+        visible = min(levels, self.VISIBLE_LEVELS)
+
+        # Asks (sells) - shown in red, reversed so the lowest ask stays at the bottom
+        self.ask_table = CanvasTable(
+            book_frame, self._columns("#ff4444"),
+            length=lambda: len(self.asks),
+            rows=lambda start, n: [self._format_level(level) for level in self.asks[start:start + n]],
+            height=visible, stick="bottom"
+        )
+        self.ask_table.pack(fill=tk.X, pady=(5, 0))
 
         # Spread indicator
         self.spread_label = tk.Label(
@@ -70,49 +96,48 @@ class OrderBookPanel:
         self.spread_label.pack(fill=tk.X, pady=3)
 
         # Bids (buys) - shown in green
-        self.bids_frame = tk.Frame(book_frame, bg="#1e1e1e")
-        self.bids_frame.pack(fill=tk.X, pady=(0, 5))
-
-        # Store label references
-        self.ask_labels = []
-        self.bid_labels = []
-
-        # Create rows
-        for i in range(10):
-            row = self._create_row(self.asks_frame, "#ff4444")
-            self.ask_labels.append(row)
-
-        for i in range(10):
-            row = self._create_row(self.bids_frame, "#00ff88")
-            self.bid_labels.append(row)
-
-    def _create_row(self, parent, color):
-        """Create a row for order book entry."""
-        frame = tk.Frame(parent, bg="#1e1e1e")
-        frame.pack(fill=tk.X)
-
-        price_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                               bg="#1e1e1e", fg=color, width=12, anchor="e")
-        price_label.pack(side=tk.LEFT)
-
-        amount_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                                bg="#1e1e1e", fg="#cccccc", width=12, anchor="e")
-        amount_label.pack(side=tk.LEFT)
+        self.bid_table = CanvasTable(
+            book_frame, self._columns("#00ff88"),
+            length=lambda: len(self.bids),
+            rows=lambda start, n: [self._format_level(level) for level in self.bids[start:start + n]],
+            height=visible, header=False
+        )
+        self.bid_table.pack(fill=tk.X, pady=(0, 5))
 
-        total_label = tk.Label(frame, text="--", font=("Consolas", 9),
-                               bg="#1e1e1e", fg="#888888", width=12, anchor="e")
-        total_label.pack(side=tk.LEFT)
+    def _columns(self, color):
+        """Table columns of one side, with its price colour."""
+        return [("Price", 12, color), ("Amount", 12, "#cccccc"), ("Total", 12, "#888888")]
 
-        return (price_label, amount_label, total_label)
+    def _format_level(self, level):
+        price, amount = level
+        info = self.info
+        return (info.price(price), info.qty(amount), f"{price * amount:,.2f}")
 
     def set_symbol(self, symbol):
-        """Change the symbol being tracked."""
-        was_active = self.is_active
-        if was_active:
-            self.stop()
+        """Change the symbol being tracked.
+
+        A symbol still in the cache repaints at once from its warm book.
+        """
         self.symbol = symbol.upper() + "USDT"
-        if was_active:
-            self.start()
+        self.book = self._book_for(self.symbol)
+        if self.is_active:
+            self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
+
+    def _book_for(self, symbol):
+        """Return the cached book of a symbol, creating it if needed."""
+        state = self.cache.touch(symbol)
+        if state.book is None:
+            state.book = DepthBook()
+        return state.book
+
+    def set_depth(self, levels):
+        """Change how many levels are shown on each side."""
+        self.levels = int(levels)
+        visible = min(self.levels, self.VISIBLE_LEVELS)
+        self.ask_table.set_height(visible)
+        self.bid_table.set_height(visible)
+        self.scheduler.mark_dirty(self)
 
     def show(self):
         """Show the panel."""
@@ -125,97 +150,136 @@ class OrderBookPanel:
         self.frame.pack_forget()
 
     def start(self):
-        """Start WebSocket for order book updates."""
+        """Start order book updates."""
         if self.is_active:
             return
         self.is_active = True
+        self.book = self._book_for(self.symbol)
+        self._follow(self.symbol)
+        self.scheduler.mark_dirty(self)
 
-        # First get initial snapshot via REST
-        self._fetch_initial_depth()
-
-        # Then connect to WebSocket for updates
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@depth10@100ms"
-
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self._on_message,
-            on_error=lambda ws, err: print(f"OrderBook error: {err}"),
-            on_close=lambda ws, s, m: None,
-            on_open=lambda ws: print(f"OrderBook connected for {self.symbol}")
-        )
-
-        threading.Thread(target=self.ws.run_forever, daemon=True).start()
-
-    def _fetch_initial_depth(self):
-        """Fetch initial order book snapshot."""
+    def _follow(self, symbol):
+        """Subscribe to a symbol's diffs and sync its book, unless already live."""
+        if symbol in self.streams:
+            return
+        book = self._book_for(symbol)
+        book.reset()
+
+        # Subscribe first so diffs are buffered while the snapshot loads
+        stream = f"{symbol.lower()}@depth@100ms"
+        self.streams[symbol] = stream
+        self.hub.subscribe(stream, self._on_message)
+        self._request_resync(symbol, book)
+
+    def _unfollow(self, symbol):
+        """Unsubscribe from a symbol and drop its pending snapshot."""
+        stream = self.streams.pop(symbol, None)
+        if stream:
+            self.hub.unsubscribe(stream, self._on_message)
+        future = self.pending.pop(symbol, None)
+        if future:
+            future.cancel()
+        self.resyncing.pop(symbol, None)
+        self.backoffs.pop(symbol, None)
+        self.retry_at.pop(symbol, None)
+
+    def _on_evict(self, symbol, state):
+        self._unfollow(symbol)
+
+    def _fetch_initial_depth(self, symbol, book):
+        """Fetch an order book snapshot and load it into ``book``."""
         try:
-            url = "https://api.binance.com/api/v3/depth"
-            params = {"symbol": self.symbol, "limit": 10}
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
-            self.parent.after(0, self._update_display, data['bids'], data['asks'])
+            params = {"symbol": symbol, "limit": self.SNAPSHOT_LIMIT}
+            data = self.bootstrap.get_json("/api/v3/depth", params, timeout=5)
+            synced = book.load_snapshot(data)
+            if symbol == self.symbol:
+                self.scheduler.mark_dirty(self)
+            return synced
         except Exception as e:
             print(f"Error fetching depth: {e}")
+            return False
 
-    def _on_message(self, ws, message):
-        """Handle order book updates."""
-        if not self.is_active:
+    def _request_resync(self, symbol, book):
+        """Load a snapshot on the bootstrap pool unless one is in flight."""
+        if symbol in self.resyncing or symbol not in self.streams:
             return
+        if time.monotonic() < self.retry_at.get(symbol, 0):
+            return
+        token = object()
+        self.resyncing[symbol] = token
+        self.pending[symbol] = self.bootstrap.submit(self._sync_depth, symbol, book, token)
 
-        data = json.loads(message)
-        bids = data.get('bids', [])
-        asks = data.get('asks', [])
+    def _sync_depth(self, symbol, book, token):
+        """Fetch snapshots until the book is in sync (runs on the pool).
 
-        self.parent.after(0, self._update_display, bids, asks)
+        When every attempt fails, the next resync waits for a growing
+        backoff instead of starting again on the next diff.
+        """
+        try:
+            for attempt in range(self.RESYNC_ATTEMPTS):
+                # Stopped, evicted or refollowed meanwhile: a newer resync owns the book
+                if self.resyncing.get(symbol) is not token:
+                    return
+                if self._fetch_initial_depth(symbol, book):
+                    self.backoffs.pop(symbol, None)
+                    return
+                time.sleep(1)
+            if self.resyncing.get(symbol) is not token:
+                return
+            backoff = self.backoffs.setdefault(symbol, Backoff(2.0, 60.0))
+            delay = backoff.next()
+            self.retry_at[symbol] = time.monotonic() + delay
+            print(f"Order book for {symbol} still out of sync, retrying in {delay:.1f}s")
+        finally:
+            if self.resyncing.get(symbol) is token:
+                del self.resyncing[symbol]
+
+    def _on_message(self, data):
+        """Apply a diff-depth event to the symbol's local book."""
+        symbol = data.symbol
+        state = self.cache.peek(symbol)
+        if state is None or state.book is None or symbol not in self.streams:
+            return
+
+        book = state.book
+        if not book.apply_diff(data):
+            print(f"Order book out of sync for {symbol}, resyncing")
+        if not book.is_synced:
+            self._request_resync(symbol, book)
+        if symbol == self.symbol:
+            self.scheduler.mark_dirty(self)
 
-    def _update_display(self, bids, asks):
-        """Update the order book display."""
+    def _update_display(self):
+        """Update the order book display from the local book."""
         if not self.is_active:
             return
 
-        # Update asks (reversed so lowest ask is at bottom)
-        asks_reversed = list(reversed(asks[:10]))
-        for i, row in enumerate(self.ask_labels):
-            if i < len(asks_reversed):
-                price = float(asks_reversed[i][0])
-                amount = float(asks_reversed[i][1])
-                total = price * amount
-                row[0].config(text=f"{price:,.2f}")
-                row[1].config(text=f"{amount:.4f}")
-                row[2].config(text=f"{total:,.2f}")
-            else:
-                row[0].config(text="--")
-                row[1].config(text="--")
-                row[2].config(text="--")
-
-        # Update bids
-        for i, row in enumerate(self.bid_labels):
-            if i < len(bids):
-                price = float(bids[i][0])
-                amount = float(bids[i][1])
-                total = price * amount
-                row[0].config(text=f"{price:,.2f}")
-                row[1].config(text=f"{amount:.4f}")
-                row[2].config(text=f"{total:,.2f}")
-            else:
-                row[0].config(text="--")
-                row[1].config(text="--")
-                row[2].config(text="--")
+        bids, asks = self.book.top(self.levels)
+        self.info = self.symbols.get(self.symbol)
+
+        # Asks reversed so the lowest ask is at the bottom
+        self.asks = asks[::-1]
+        self.bids = bids
+        self.ask_table.refresh()
+        self.bid_table.refresh()
 
         # Update spread
-        if bids and asks:
-            best_bid = float(bids[0][0])
-            best_ask = float(asks[0][0])
+        if not self.book.is_synced:
+            text = "Resyncing order book..." if bids or asks else "Loading order book..."
+            self.spread_label.config(text=text)
+        elif bids and asks:
+            best_bid = bids[0][0]
+            best_ask = asks[0][0]
             spread = best_ask - best_bid
             spread_pct = (spread / best_ask) * 100
-            self.spread_label.config(text=f"Spread: {spread:.2f} ({spread_pct:.3f}%)")
+            self.spread_label.config(
+                text=f"Spread: {self.info.price(spread)} ({spread_pct:.3f}%)")
 
     def stop(self):
-        """Stop WebSocket connection."""
+        """Stop order book updates for every followed symbol."""
         self.is_active = False
-        if self.ws:
-            self.ws.close()
-            self.ws = None
+        for symbol in list(self.streams):
+            self._unfollow(symbol)
 
     def pack(self, **kwargs):
         self.frame.pack(**kwargs)
\ No newline at end of file
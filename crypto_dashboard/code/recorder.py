@@ -0,0 +1,182 @@
+import gzip
+import json
+import threading
+import time
+
+from streams import StreamHub
+from bootstrap import Bootstrapper
+
+
+class FeedRecorder:
+    """Appends raw stream frames and REST responses to a gzip JSON-lines log.
+
+    Each line holds the receive time ``t`` (epoch seconds) and either the
+    raw combined-stream frame under ``ws`` or a REST response under
+    ``rest`` with its ``params`` and decoded ``body``. The log is opened in
+    append mode, so several sessions can be recorded into one file.
+    """
+
+    FLUSH_INTERVAL = 1.0  # seconds between flushes of the compressed stream
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        self.last_flush = time.time()
+        self.entries = 0
+
+    def record_frame(self, message):
+        """Log one raw WebSocket frame."""
+        self._write({"t": time.time(), "ws": message})
+
+    def record_rest(self, path, params, body):
+        """Log one decoded REST response."""
+        self._write({"t": time.time(), "rest": path, "params": params or {}, "body": body})
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.entries += 1
+            if entry["t"] - self.last_flush >= self.FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush = entry["t"]
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_log(path):
+    """Yield the entries of a recorded log, stopping at a truncated tail."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except (EOFError, OSError):
+            # The recorder was killed before closing the file
+            return
+
+
+class ReplayHub(StreamHub):
+    """Hub that never connects; a FeedReplayer feeds it recorded frames."""
+
+    def subscribe(self, stream, callback):
+        with self.lock:
+            if self.is_closed:
+                return
+            callbacks = self.callbacks.get(stream, ())
+            if callback not in callbacks:
+                self.callbacks[stream] = callbacks + (callback,)
+
+    def unsubscribe(self, stream, callback):
+        with self.lock:
+            callbacks = tuple(cb for cb in self.callbacks.get(stream, ()) if cb != callback)
+            if callbacks:
+                self.callbacks[stream] = callbacks
+            else:
+                self.callbacks.pop(stream, None)
+
+
+class ReplayBootstrapper(Bootstrapper):
+    """Bootstrapper answering REST requests from a recorded log.
+
+    Responses are matched by API path and symbol and served in recorded
+    order; once a key runs out its last response is repeated.
+    """
+
+    def __init__(self, path, workers=4):
+        super().__init__(workers)
+        self.responses = {}
+        for entry in read_log(path):
+            if "rest" in entry:
+                key = (entry["rest"], entry["params"].get("symbol"))
+                self.responses.setdefault(key, []).append(entry["body"])
+        self.lock = threading.Lock()
+
+    def get_json(self, path, params=None, timeout=10):
+        key = (path, (params or {}).get("symbol"))
+        with self.lock:
+            bodies = self.responses.get(key)
+            if not bodies:
+                raise LookupError(f"No recorded response for {path} {key[1]}")
+            body = bodies.pop(0) if len(bodies) > 1 else bodies[0]
+        if self.recorder:
+            self.recorder.record_rest(path, params, body)
+        return body
+
+
+class FeedReplayer:
+    """Feeds recorded frames into a hub at 1x, Nx or full speed.
+
+    With ``speed`` 0 frames are dispatched back to back, which measures the
+    highest message rate the panels can sustain.
+    """
+
+    def __init__(self, path, hub, speed=1.0, on_done=None):
+        self.path = path
+        self.hub = hub
+        self.speed = speed
+        self.on_done = on_done
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.frames = 0
+        self.max_lag = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="replay", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.started_at = time.perf_counter()
+        first = None
+        for entry in read_log(self.path):
+            if self.stop_event.is_set():
+                break
+            if "ws" not in entry:
+                continue
+
+            if self.speed:
+                if first is None:
+                    first = entry["t"]
+                due = (entry["t"] - first) / self.speed
+                delay = due - (time.perf_counter() - self.started_at)
+                if delay > 0:
+                    self.stop_event.wait(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+
+            self.hub._dispatch(entry["ws"])
+            self.frames += 1
+
+        self.finished_at = time.perf_counter()
+        if self.on_done and not self.stop_event.is_set():
+            self.on_done(self.stats())
+
+    def stats(self):
+        """Return frames replayed, elapsed seconds, frame rate and worst lag."""
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "frames": self.frames,
+            "elapsed": elapsed,
+            "frames_per_second": self.frames / elapsed if elapsed else 0.0,
+            "max_lag": self.max_lag
+        }
+
+    def wait(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def stop(self):
+        self.stop_event.set()
+        self.wait(1.0)
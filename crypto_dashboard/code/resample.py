@@ -0,0 +1,87 @@
+import numpy as np
+
+from candles import CandleBuffer
+
+# Interval lengths in milliseconds, keyed by Binance interval names
+TIMEFRAMES = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+
+
+def _merge(a, b):
+    """Combine two (open, high, low, close, volume) tuples, a before b."""
+    if a is None:
+        return b
+    return (a[0], max(a[1], b[1]), min(a[2], b[2]), b[3], a[4] + b[4])
+
+
+class Resampler:
+    """Builds higher-timeframe candles from 1m candles.
+
+    The open bucket is kept as the aggregate of its closed 1m candles plus
+    the live 1m candle, so a live kline update only recombines two tuples
+    instead of rescanning the bucket.
+    """
+
+    def __init__(self, interval_ms, capacity=1000):
+        self.interval_ms = interval_ms
+        self.candles = CandleBuffer(capacity)
+        self.bucket = None
+        self.base = None        # closed 1m candles of the open bucket
+        self.live_time = None
+        self.live = None        # newest 1m candle of the open bucket
+
+    def load(self, source):
+        """Rebuild every bucket from a view of 1m candles (oldest first)."""
+        self.candles.clear()
+        self.bucket = None
+        self.base = None
+        self.live_time = None
+        self.live = None
+        if not len(source):
+            return
+
+        times = source['time']
+        buckets = times - times % self.interval_ms
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(source)] - 1
+
+        self.candles.extend(zip(
+            buckets[starts].tolist(),
+            source['open'][starts].tolist(),
+            np.maximum.reduceat(source['high'], starts).tolist(),
+            np.minimum.reduceat(source['low'], starts).tolist(),
+            source['close'][ends].tolist(),
+            np.add.reduceat(source['volume'], starts).tolist(),
+        ))
+
+        # Restore the incremental state of the open bucket
+        first = starts[-1]
+        last = len(source) - 1
+        self.bucket = int(buckets[last])
+        if last > first:
+            closed = source[first:last]
+            self.base = (closed['open'][0], closed['high'].max(), closed['low'].min(),
+                         closed['close'][-1], closed['volume'].sum())
+        row = source[last]
+        self.live_time = int(row['time'])
+        self.live = (row['open'], row['high'], row['low'], row['close'], row['volume'])
+
+    def update(self, time, open_, high, low, close, volume):
+        """Fold one 1m candle update in. Returns True if a bucket was opened."""
+        bucket = time - time % self.interval_ms
+        if bucket != self.bucket:
+            self.bucket = bucket
+            self.base = None
+        elif time != self.live_time and self.live is not None:
+            # The previous 1m candle closed inside this bucket
+            self.base = _merge(self.base, self.live)
+
+        self.live_time = time
+        self.live = (open_, high, low, close, volume)
+        return self.candles.upsert(bucket, *_merge(self.base, self.live))
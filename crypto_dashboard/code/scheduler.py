@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+class RenderScheduler:
+    """Repaints changed panels at a fixed frame rate on the Tk thread.
+
+    Network threads only call ``mark_dirty``. Every tick the scheduler calls
+    the render callback of each dirty panel once, so a burst of messages
+    between two frames costs a single repaint from the newest state.
+    """
+
+    def __init__(self, root, fps=20):
+        self.root = root
+        self.lock = threading.Lock()
+        self.renderers = {}
+        self.dirty = set()
+        self.after_id = None
+        self.is_running = False
+        self.set_fps(fps)
+
+        # Optional LatencyTracker; stamps hold the local event time of the
+        # newest message that made each dirty panel dirty
+        self.latency = None
+        self.stamps = {}
+
+        # Counters
+        self.frames = 0
+        self.updates = 0
+        self.repaints = 0
+        self.coalesced = 0
+
+    def set_fps(self, fps):
+        """Change the target frame rate."""
+        self.fps = max(1, int(fps))
+        self.interval_ms = max(1, int(1000 / self.fps))
+
+    def register(self, key, callback):
+        """Register the render callback for a panel."""
+        self.renderers[key] = callback
+
+    def unregister(self, key):
+        """Forget a panel and any pending repaint."""
+        self.renderers.pop(key, None)
+        with self.lock:
+            self.dirty.discard(key)
+            self.stamps.pop(key, None)
+
+    def mark_dirty(self, key):
+        """Request a repaint of a panel on the next tick (thread-safe)."""
+        stamp = self.latency.current() if self.latency else None
+        with self.lock:
+            self.updates += 1
+            if key in self.dirty:
+                self.coalesced += 1
+            else:
+                self.dirty.add(key)
+            if stamp is not None:
+                self.stamps[key] = stamp
+
+    def start(self):
+        """Start ticking."""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop ticking."""
+        self.is_running = False
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _tick(self):
+        """Repaint every dirty panel, then schedule the next frame."""
+        if not self.is_running:
+            return
+        started = time.perf_counter()
+
+        with self.lock:
+            dirty = self.dirty
+            self.dirty = set()
+            stamps = self.stamps
+            self.stamps = {}
+
+        for key in dirty:
+            callback = self.renderers.get(key)
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                print(f"Render error: {e}")
+            stamp = stamps.get(key)
+            if stamp is not None and self.latency:
+                self.latency.record_paint(type(key).__name__, stamp)
+
+        self.frames += 1
+        self.repaints += len(dirty)
+
+        # Keep a fixed rate by subtracting the time this frame took
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        delay = max(1, self.interval_ms - elapsed_ms)
+        self.after_id = self.root.after(delay, self._tick)
+
+    def stats(self):
+        """Return frame, repaint and coalescing counters."""
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "updates": self.updates,
+            "repaints": self.repaints,
+            "coalesced": self.coalesced
+        }
+
+
+_shared_scheduler = None
+
+
+def get_scheduler(widget):
+    """Return the process-wide scheduler, creating it for widget's window."""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = RenderScheduler(widget.winfo_toplevel())
+        _shared_scheduler.start()
+    return _shared_scheduler
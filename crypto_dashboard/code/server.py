@@ -0,0 +1,494 @@
+import json
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+
+from streams import StreamHub, Backoff
+from bootstrap import Bootstrapper
+from depthbook import DepthBook
+from decoder import DepthUpdate, Ticker
+
+DEFAULT_PORT = 8765
+DEPTH_STREAM = "@depth@100ms"  # depth stream the server keeps a book for
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class ClientSession:
+    """One connected dashboard: reads its requests and writes frames and replies.
+
+    Writes go through a bounded queue drained by their own thread, so a
+    slow client never stalls the feed; one that falls too far behind is
+    disconnected and resyncs when it reconnects.
+    """
+
+    QUEUE_LIMIT = 20_000
+
+    def __init__(self, server, sock, address):
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.streams = set()
+        self.queue = queue.Queue(self.QUEUE_LIMIT)
+        self.closed = False
+
+    def start(self):
+        threading.Thread(target=self._read_loop, name=f"client-read {self.address}",
+                         daemon=True).start()
+        threading.Thread(target=self._write_loop, name=f"client-write {self.address}",
+                         daemon=True).start()
+
+    def send(self, data):
+        """Queue bytes for the client."""
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            print(f"Client {self.address} fell behind, disconnecting")
+            self.close()
+
+    def _write_loop(self):
+        while not self.closed:
+            try:
+                chunks = [self.queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            # Send whatever else is queued in the same write
+            while len(chunks) < 256:
+                try:
+                    chunks.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.sock.sendall(b"".join(chunks))
+            except OSError:
+                break
+        self.close()
+
+    def _read_loop(self):
+        try:
+            with self.sock.makefile("rb") as f:
+                for line in f:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.server.handle(self, request)
+        except OSError:
+            pass
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.server.drop(self)
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class MarketDataServer:
+    """Headless data side shared by every dashboard on a machine or floor.
+
+    The server holds the only exchange connections. Clients speak
+    newline-delimited JSON over TCP:
+
+    - ``{"op": "subscribe" | "unsubscribe", "stream": name}`` starts or
+      stops the combined-stream frames of a stream (the deltas), forwarded
+      exactly as the exchange sent them.
+    - ``{"op": "get", "id": n, "path": api_path, "params": {...}}`` is
+      answered with ``{"id": n, "result": body}`` or ``{"id": n, "error": text}``
+      in the shape of the exchange's REST response.
+    - ``{"resync": [stream, ...]}`` is pushed when the server's own
+      exchange connection came back and frames of those streams may be lost.
+
+    Depth snapshots come from the server's own book and 24h statistics
+    from the latest ticker, so switching symbols costs no exchange
+    request. Other requests are forwarded once and shared between clients
+    asking within a few seconds.
+    """
+
+    DEFAULT_TTL = 2.0  # seconds a forwarded response is shared
+    CACHE_TTL = {"/api/v3/time": 0, "/api/v3/exchangeInfo": 3600}
+    SNAPSHOT_LIMIT = 1000
+    RESYNC_ATTEMPTS = 3
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, hub=None, bootstrap=None):
+        self.host = host
+        self.port = port
+        self.hub = hub or StreamHub()
+        self.hub.tap = self._forward
+        self.hub.add_resync_listener(self._on_resync)
+        self.bootstrap = bootstrap or Bootstrapper(workers=8)
+        self.lock = threading.Lock()
+        self.clients = {}    # stream -> tuple of sessions
+        self.books = {}      # symbol -> (DepthBook, lock serialising snapshot loads)
+        self.tickers = {}    # symbol -> latest Ticker
+        self.responses = {}  # (path, params) -> (expiry, body)
+        self.inflight = {}   # (path, params) -> Future of the forwarded request
+        self.listener = None
+
+    def serve_forever(self):
+        """Accept clients until closed."""
+        self.listener = socket.create_server((self.host, self.port))
+        print(f"Market data server listening on {self.host}:{self.port}")
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            print(f"Client connected: {address[0]}:{address[1]}")
+            ClientSession(self, sock, f"{address[0]}:{address[1]}").start()
+
+    def close(self):
+        if self.listener:
+            self.listener.close()
+        self.hub.close()
+        self.bootstrap.shutdown()
+
+    def handle(self, session, request):
+        """Handle one client request (on the session's reader thread)."""
+        op = request.get("op")
+        if op == "subscribe":
+            self._subscribe(session, request["stream"])
+        elif op == "unsubscribe":
+            self._unsubscribe(session, request["stream"])
+        elif op == "get":
+            self.bootstrap.submit(self._answer, session, request)
+
+    def _subscribe(self, session, stream):
+        with self.lock:
+            if stream in session.streams:
+                return
+            session.streams.add(stream)
+            sessions = self.clients.get(stream, ())
+            self.clients[stream] = sessions + (session,)
+            if sessions:
+                return
+            if stream.endswith(DEPTH_STREAM):
+                # Diffs are buffered until the first snapshot request
+                self.books[stream.partition("@")[0].upper()] = (DepthBook(), threading.Lock())
+            self.hub.subscribe(stream, self._on_record)
+
+    def _unsubscribe(self, session, stream):
+        with self.lock:
+            if stream not in session.streams:
+                return
+            session.streams.discard(stream)
+            sessions = tuple(s for s in self.clients.get(stream, ()) if s is not session)
+            if sessions:
+                self.clients[stream] = sessions
+                return
+            self.clients.pop(stream, None)
+            symbol = stream.partition("@")[0].upper()
+            if stream.endswith(DEPTH_STREAM):
+                self.books.pop(symbol, None)
+            elif stream.endswith("@ticker"):
+                self.tickers.pop(symbol, None)
+            self.hub.unsubscribe(stream, self._on_record)
+
+    def drop(self, session):
+        """Release every stream of a disconnected client."""
+        for stream in list(session.streams):
+            self._unsubscribe(session, stream)
+
+    def _on_record(self, record):
+        """Keep server-side state current for the snapshots served locally."""
+        if isinstance(record, DepthUpdate):
+            entry = self.books.get(record.symbol)
+            if entry:
+                # A gap leaves the book unsynced until the next snapshot request
+                entry[0].apply_diff(record)
+        elif isinstance(record, Ticker):
+            self.tickers[record.symbol] = record
+
+    def _on_resync(self, streams):
+        """Tell clients which of their streams had a gap upstream."""
+        affected = {}
+        with self.lock:
+            for stream in streams:
+                for session in self.clients.get(stream, ()):
+                    affected.setdefault(session, []).append(stream)
+        for session, names in affected.items():
+            session.send(_encode({"resync": sorted(names)}))
+
+    def _forward(self, stream, message):
+        """Hub tap: send a raw frame to every client of its stream."""
+        sessions = self.clients.get(stream)
+        if not sessions:
+            return
+        data = message.encode() + b"\n"
+        for session in sessions:
+            session.send(data)
+
+    def _answer(self, session, request):
+        """Answer a get request (runs on the bootstrap pool)."""
+        try:
+            body = self._get(request["path"], request.get("params") or {})
+            session.send(_encode({"id": request.get("id"), "result": body}))
+        except Exception as e:
+            session.send(_encode({"id": request.get("id"), "error": str(e)}))
+
+    def _get(self, path, params):
+        symbol = params.get("symbol")
+        if path == "/api/v3/depth" and symbol in self.books:
+            snapshot = self._depth_snapshot(symbol, int(params.get("limit", 100)))
+            if snapshot is not None:
+                return snapshot
+        if path == "/api/v3/ticker/24hr" and symbol in self.tickers:
+            t = self.tickers[symbol]
+            return {
+                "symbol": symbol,
+                "lastPrice": str(t.last),
+                "openPrice": str(t.open),
+                "highPrice": str(t.high),
+                "lowPrice": str(t.low),
+                "volume": str(t.volume),
+                "priceChange": str(t.change),
+                "priceChangePercent": str(t.change_pct)
+            }
+        return self._get_shared(path, params)
+
+    def _depth_snapshot(self, symbol, limit):
+        """Serve a snapshot from the server's book, syncing it first if needed."""
+        entry = self.books.get(symbol)
+        if entry is None:
+            return None
+        book, sync_lock = entry
+        with sync_lock:
+            for attempt in range(self.RESYNC_ATTEMPTS):
+                if book.is_synced:
+                    break
+                params = {"symbol": symbol, "limit": self.SNAPSHOT_LIMIT}
+                if book.load_snapshot(self.bootstrap.get_json("/api/v3/depth", params, timeout=5)):
+                    break
+                time.sleep(1)
+        return book.snapshot(limit)
+
+    def _get_shared(self, path, params):
+        """Forward a request, sharing one exchange call between concurrent askers."""
+        key = (path, json.dumps(params, sort_keys=True))
+        ttl = self.CACHE_TTL.get(path, self.DEFAULT_TTL)
+        with self.lock:
+            cached = self.responses.get(key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = Future()
+        if not owner:
+            return future.result(timeout=15)
+
+        try:
+            body = self.bootstrap.get_json(path, params, timeout=10)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+        future.set_result(body)
+
+        if ttl:
+            now = time.monotonic()
+            with self.lock:
+                if len(self.responses) > 1000:
+                    self.responses = {k: v for k, v in self.responses.items() if v[0] > now}
+                self.responses[key] = (now + ttl, body)
+        return body
+
+
+class ServerLink:
+    """Connection from a dashboard to a MarketDataServer.
+
+    Shared by ServerHub (frames) and ServerBootstrapper (get requests).
+    When the server goes away the link keeps reconnecting with a jittered
+    backoff, subscribes its streams again and reports them to the hub's
+    resync listeners; order books notice the gap and resync themselves.
+    """
+
+    def __init__(self, address):
+        host, _, port = address.rpartition(":")
+        self.host = host or "127.0.0.1"
+        self.port = int(port or DEFAULT_PORT)
+        self.hub = None
+        self.lock = threading.Lock()
+        self.sock = None
+        self.streams = set()
+        self.pending = {}    # request id -> Future
+        self.request_id = 0
+        self.closed = False
+        self.connected = threading.Event()
+        self.backoff = Backoff(1.0, 30.0)
+        threading.Thread(target=self._run, name="server-link", daemon=True).start()
+
+    def _run(self):
+        reconnect = False
+        while not self.closed:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=5)
+            except OSError as e:
+                delay = self.backoff.next()
+                print(f"Market data server unavailable ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.backoff.reset()
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.sock = sock
+                for stream in self.streams:
+                    self._send_locked({"op": "subscribe", "stream": stream})
+                streams = set(self.streams)
+            self.connected.set()
+            print(f"Connected to market data server {self.host}:{self.port}")
+            if reconnect and self.hub:
+                self.hub._resync(streams)
+            reconnect = True
+
+            try:
+                with sock.makefile("rb") as f:
+                    for line in f:
+                        self._on_line(line)
+            except OSError:
+                pass
+
+            self.connected.clear()
+            with self.lock:
+                self.sock = None
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError("Market data server disconnected"))
+            sock.close()
+            if not self.closed:
+                time.sleep(self.backoff.next())
+
+    def _on_line(self, line):
+        # Forwarded exchange frames go straight to the hub's decoder
+        if line.startswith(b'{"stream"'):
+            if self.hub:
+                self.hub._dispatch(line.decode(), time.time())
+            return
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            return
+        with self.lock:
+            future = self.pending.pop(reply.get("id"), None)
+        if "resync" in reply:
+            if self.hub:
+                self.hub._resync(set(reply["resync"]))
+            return
+        if future is None:
+            return
+        if "error" in reply:
+            future.set_exception(RuntimeError(f"Server error: {reply['error']}"))
+        else:
+            future.set_result(reply.get("result"))
+
+    def _send_locked(self, message):
+        if self.sock is None:
+            return False
+        try:
+            self.sock.sendall(_encode(message))
+            return True
+        except OSError:
+            return False
+
+    def subscribe(self, stream):
+        with self.lock:
+            self.streams.add(stream)
+            self._send_locked({"op": "subscribe", "stream": stream})
+
+    def unsubscribe(self, stream):
+        with self.lock:
+            self.streams.discard(stream)
+            self._send_locked({"op": "unsubscribe", "stream": stream})
+
+    def request(self, path, params, timeout=10):
+        """Send a get request and wait for its body."""
+        if not self.connected.wait(timeout):
+            raise ConnectionError("Not connected to market data server")
+        future = Future()
+        with self.lock:
+            self.request_id += 1
+            request_id = self.request_id
+            self.pending[request_id] = future
+            sent = self._send_locked({"op": "get", "id": request_id, "path": path,
+                                      "params": params})
+        if not sent:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise ConnectionError("Not connected to market data server")
+        return future.result(timeout)
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            if self.sock:
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class ServerHub(StreamHub):
+    """Hub whose streams come from a MarketDataServer instead of the exchange."""
+
+    def __init__(self, link, decoder=None):
+        super().__init__(decoder)
+        self.link = link
+        link.hub = self
+
+    def subscribe(self, stream, callback):
+        with self.lock:
+            if self.is_closed:
+                return
+            callbacks = self.callbacks.get(stream, ())
+            if callback in callbacks:
+                return
+            self.callbacks[stream] = callbacks + (callback,)
+            if not callbacks:
+                self.link.subscribe(stream)
+
+    def unsubscribe(self, stream, callback):
+        with self.lock:
+            callbacks = tuple(cb for cb in self.callbacks.get(stream, ()) if cb != callback)
+            if callbacks:
+                self.callbacks[stream] = callbacks
+            elif self.callbacks.pop(stream, None):
+                self.link.unsubscribe(stream)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "connections": 1 if self.link.connected.is_set() else 0,
+                "streams": len(self.callbacks),
+                "callbacks": sum(len(cbs) for cbs in self.callbacks.values())
+            }
+
+    def close(self):
+        super().close()
+        self.link.close()
+
+
+class ServerBootstrapper(Bootstrapper):
+    """Bootstrapper asking a MarketDataServer instead of the exchange's REST API."""
+
+    def __init__(self, link, workers=4):
+        super().__init__(workers)
+        self.link = link
+
+    def get_json(self, path, params=None, timeout=10):
+        body = self.link.request(path, dict(params or {}), timeout)
+        if self.recorder:
+            self.recorder.record_rest(path, params, body)
+        return body
@@ -0,0 +1,34 @@
+import time
+
+
+class StartupTimer:
+    """Times startup from launch to the first data each panel can paint.
+
+    ``mark`` closes a phase (imports, widgets, subscribe) and
+    ``first_data`` records when a panel first had data, counted from
+    launch. The scheduler paints a dirty panel within one frame, so that
+    is the panel's time to first paint.
+    """
+
+    def __init__(self, launched=None):
+        self.launched = launched or time.perf_counter()
+        self.last = self.launched
+        self.phases = []
+        self.first = {}
+
+    def mark(self, phase):
+        """End a phase that started where the previous one ended."""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def first_data(self, panel):
+        if panel not in self.first:
+            self.first[panel] = (time.perf_counter() - self.launched) * 1000
+
+    def report(self, pending=()):
+        """Return the timings as one line; ``pending`` panels never got data."""
+        phases = " | ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases)
+        first = [f"{panel} {ms:.0f} ms" for panel, ms in sorted(self.first.items(), key=lambda i: i[1])]
+        first += [f"{panel} no data" for panel in pending]
+        return f"Startup: {phases} | first data after launch: {', '.join(first) or 'none'}"
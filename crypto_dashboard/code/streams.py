@@ -0,0 +1,411 @@
+import json
+import random
+import threading
+import time
+
+import websocket
+
+from decoder import Decoder
+
+
+class Backoff:
+    """Exponential reconnect delays with jitter.
+
+    Each delay is drawn between half and all of ``base * 2 ** attempt``
+    (capped), so clients dropped together do not reconnect in lockstep.
+    """
+
+    def __init__(self, base=1.0, cap=60.0):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next(self):
+        delay = min(self.cap, self.base * 2 ** self.attempt)
+        self.attempt += 1
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.attempt = 0
+
+
+class StreamConnection:
+    """One Binance combined-stream WebSocket carrying a group of streams.
+
+    The socket runs under a supervisor loop: when it closes, or misses a
+    pong, it is reopened after a jittered backoff with the streams it
+    carries by then, and the hub tells its resync listeners.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.ws = None
+        self.thread = None
+        self.is_open = False
+        self.streams = set()       # streams this connection should carry
+        self.sent = set()          # streams the exchange knows about
+        self.pending_sub = set()
+        self.pending_unsub = set()
+        self.flush_timer = None
+        self.last_flush = 0.0
+        self.stopped = False
+        self.wake = threading.Event()
+        self.backoff = Backoff(hub.BACKOFF_BASE, hub.BACKOFF_MAX)
+        self.opened_at = None      # monotonic time of the last successful open
+        self.opens = 0
+        self.predecessor = None    # connection this one replaces once open
+        self.successor = None      # rollover connection being opened
+        self.retired = False       # replaced: frames still in flight are ignored
+
+    def start(self):
+        """Start the supervised socket thread."""
+        self.thread = threading.Thread(target=self._run, name="stream", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """Keep the socket open until stopped, backing off between attempts."""
+        while not self.stopped:
+            with self.hub.lock:
+                if self.stopped:
+                    break
+                # The streams known so far go in the URL
+                self.sent = set(self.streams)
+                url = f"{self.hub.BASE_URL}?streams={'/'.join(sorted(self.sent))}"
+                self.ws = websocket.WebSocketApp(
+                    url,
+                    on_message=self._on_message,
+                    on_error=lambda ws, err: print(f"Stream error: {err}"),
+                    on_close=self._on_close,
+                    on_open=self._on_open
+                )
+                ws = self.ws
+
+            self.opened_at = None
+            try:
+                # Pings every PING_INTERVAL; no pong within PING_TIMEOUT closes the socket
+                ws.run_forever(ping_interval=self.hub.PING_INTERVAL,
+                               ping_timeout=self.hub.PING_TIMEOUT)
+            except Exception as e:
+                print(f"Stream error: {e}")
+            self.is_open = False
+            if self.stopped:
+                break
+
+            if self.opened_at and time.monotonic() - self.opened_at > self.hub.STABLE_AFTER:
+                self.backoff.reset()
+            delay = self.backoff.next()
+            print(f"Stream disconnected, reconnecting in {delay:.1f}s")
+            self.wake.wait(delay)
+
+    def stop(self):
+        """Close the socket for good."""
+        self.stopped = True
+        self.is_open = False
+        self.wake.set()
+        if self.flush_timer:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        if self.successor:
+            self.successor.stop()
+            self.successor = None
+        if self.ws:
+            self.ws.close()
+            self.ws = None
+
+    def add(self, stream):
+        """Queue a SUBSCRIBE for a stream (called with the hub lock held)."""
+        self.streams.add(stream)
+        self.pending_unsub.discard(stream)
+        if stream not in self.sent:
+            self.pending_sub.add(stream)
+        self._schedule_flush()
+
+    def remove(self, stream):
+        """Queue an UNSUBSCRIBE for a stream (called with the hub lock held)."""
+        self.streams.discard(stream)
+        self.pending_sub.discard(stream)
+        if stream in self.sent:
+            self.pending_unsub.add(stream)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Batch control frames so we stay under Binance's 5 messages/s limit."""
+        if not self.is_open or self.flush_timer:
+            return
+        delay = self.last_flush + self.hub.CONTROL_INTERVAL - time.monotonic()
+        if delay <= 0:
+            self._flush_locked()
+        else:
+            self.flush_timer = threading.Timer(delay, self._flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def _flush(self):
+        with self.hub.lock:
+            self.flush_timer = None
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Send one SUBSCRIBE and one UNSUBSCRIBE frame for pending changes."""
+        if not self.is_open or not self.ws:
+            return
+        try:
+            if self.pending_unsub:
+                self._send("UNSUBSCRIBE", self.pending_unsub)
+                self.sent -= self.pending_unsub
+                self.pending_unsub = set()
+            if self.pending_sub:
+                self._send("SUBSCRIBE", self.pending_sub)
+                self.sent |= self.pending_sub
+                self.pending_sub = set()
+        except Exception as e:
+            print(f"Stream control error: {e}")
+        self.last_flush = time.monotonic()
+
+    def _send(self, method, streams):
+        self.ws.send(json.dumps({
+            "method": method,
+            "params": sorted(streams),
+            "id": self.hub.next_request_id()
+        }))
+
+    def _on_open(self, ws):
+        print(f"Stream connected ({len(self.sent)} streams)")
+        with self.hub.lock:
+            if self.stopped:
+                return
+            if self.predecessor:
+                self.hub._take_over_locked(self.predecessor, self)
+                self.predecessor = None
+            elif self.successor:
+                # Reopened on its own before the rollover finished
+                self.successor.stop()
+                self.successor = None
+            self.is_open = True
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            reopened = self.opens > 1
+            streams = set(self.streams)
+            # Reconcile anything that changed while the handshake was running
+            self.pending_sub = self.streams - self.sent
+            self.pending_unsub = self.sent - self.streams
+            self._flush_locked()
+        if reopened:
+            # Frames were missed while the socket was down
+            self.hub._resync(streams)
+
+    def _on_close(self, ws, status, msg):
+        self.is_open = False
+
+    def _on_message(self, ws, message):
+        if not self.retired:
+            self.hub._dispatch(message, time.time())
+
+
+class StreamHub:
+    """Shares a small pool of combined-stream connections between all panels.
+
+    Panels register a callback per stream name (e.g. ``btcusdt@ticker``).
+    Each frame is decoded once into a typed record (see ``decoder.py``) and
+    handed to every callback of its stream, so two panels watching the
+    same stream cost one subscription.
+
+    Binance closes every connection after 24 hours, so a supervisor opens
+    a replacement carrying the same streams shortly before and hands the
+    streams over once it is up (make before break). Panels that keep
+    state built from deltas register a resync listener to repair only
+    what a real disconnect may have lost.
+    """
+
+    BASE_URL = "wss://stream.binance.com:9443/stream"
+    MAX_STREAMS_PER_CONNECTION = 200
+    CONTROL_INTERVAL = 0.5  # seconds between control frame batches
+    PING_INTERVAL = 20      # seconds between pings
+    PING_TIMEOUT = 10       # seconds to wait for a pong before reconnecting
+    BACKOFF_BASE = 1.0      # first reconnect delay, doubled per failed attempt
+    BACKOFF_MAX = 60.0
+    STABLE_AFTER = 60       # seconds a connection must stay up to reset the backoff
+    ROLLOVER_AFTER = 23.5 * 3600  # connection age at which it is replaced
+    SUPERVISE_INTERVAL = 60
+
+    def __init__(self, decoder=None):
+        self.lock = threading.Lock()
+        self.decoder = decoder or Decoder()
+        self.callbacks = {}     # stream -> tuple of callbacks
+        self.owners = {}        # stream -> StreamConnection
+        self.connections = []
+        self.request_id = 0
+        self.is_closed = False
+        self.recorder = None    # FeedRecorder logging every raw frame
+        self.latency = None     # LatencyTracker stamping every frame
+        self.tap = None         # callable(stream, raw frame) run after the callbacks
+        self.resync_listeners = []
+        self.failure = None     # why the feed stopped for good, shown by the dashboard
+        self.supervisor = None
+        self.closed_event = threading.Event()
+
+    def next_request_id(self):
+        self.request_id += 1
+        return self.request_id
+
+    def subscribe(self, stream, callback):
+        """Route decoded payloads of ``stream`` to ``callback``."""
+        with self.lock:
+            if self.is_closed:
+                return
+            callbacks = self.callbacks.get(stream, ())
+            if callback in callbacks:
+                return
+            self.callbacks[stream] = callbacks + (callback,)
+            if stream in self.owners:
+                return
+
+            conn = self._pick_connection()
+            self.owners[stream] = conn
+            conn.add(stream)
+            if conn.thread is None:
+                conn.start()
+
+    def unsubscribe(self, stream, callback):
+        """Stop routing ``stream`` to ``callback``; drop the stream if unused."""
+        with self.lock:
+            callbacks = tuple(cb for cb in self.callbacks.get(stream, ()) if cb != callback)
+            if callbacks:
+                self.callbacks[stream] = callbacks
+                return
+
+            self.callbacks.pop(stream, None)
+            conn = self.owners.pop(stream, None)
+            if conn is None:
+                return
+            conn.remove(stream)
+            if not conn.streams:
+                conn.stop()
+                self.connections.remove(conn)
+
+    def _pick_connection(self):
+        """Return the least loaded connection with room, opening one if needed."""
+        open_conns = [c for c in self.connections
+                      if len(c.streams) < self.MAX_STREAMS_PER_CONNECTION]
+        if open_conns:
+            return min(open_conns, key=lambda c: len(c.streams))
+        conn = StreamConnection(self)
+        self.connections.append(conn)
+        if self.supervisor is None:
+            self.supervisor = threading.Thread(target=self._supervise, name="stream-supervisor",
+                                               daemon=True)
+            self.supervisor.start()
+        return conn
+
+    def _supervise(self):
+        """Replace connections that are about to reach the exchange's 24h limit."""
+        while not self.closed_event.wait(self.SUPERVISE_INTERVAL):
+            now = time.monotonic()
+            with self.lock:
+                for conn in self.connections:
+                    if (conn.is_open and not conn.successor and conn.opened_at
+                            and now - conn.opened_at > self.ROLLOVER_AFTER):
+                        self._roll_over_locked(conn)
+
+    def _roll_over_locked(self, conn):
+        """Open a replacement for ``conn`` with the same streams (hub lock held)."""
+        print(f"Rolling over stream connection ({len(conn.streams)} streams)")
+        successor = StreamConnection(self)
+        successor.streams = set(conn.streams)
+        successor.predecessor = conn
+        conn.successor = successor
+        successor.start()
+
+    def _take_over_locked(self, old, new):
+        """Move every stream of ``old`` to its now open successor (hub lock held)."""
+        # Streams added or dropped during the handshake are reconciled by the caller
+        new.streams = set(old.streams)
+        for stream in new.streams:
+            self.owners[stream] = new
+        if old in self.connections:
+            self.connections[self.connections.index(old)] = new
+        old.successor = None
+        old.retired = True
+        old.stop()
+
+    def add_resync_listener(self, callback):
+        """Call ``callback(streams)`` after a reconnect that may have missed frames.
+
+        ``streams`` is the set of stream names the reconnected socket
+        carries; the callback runs on the socket's thread.
+        """
+        self.resync_listeners.append(callback)
+
+    def _resync(self, streams):
+        for callback in list(self.resync_listeners):
+            try:
+                callback(streams)
+            except Exception as e:
+                print(f"Error resyncing streams: {e}")
+
+    def _dispatch(self, message, received=None):
+        """Decode a combined-stream frame and hand its payload to subscribers."""
+        if received is None:
+            received = time.time()
+        if self.recorder:
+            self.recorder.record_frame(message)
+        try:
+            stream, payload = self.decoder.decode(message)
+        except ValueError:
+            return
+        except (KeyError, TypeError) as e:
+            print(f"Error decoding frame: {e}")
+            return
+
+        if stream is None:
+            # Reply to a SUBSCRIBE/UNSUBSCRIBE request
+            if payload.get("error"):
+                print(f"Stream request error: {payload['error']}")
+            return
+        self._deliver(stream, payload, received, time.time(), message)
+
+    def _deliver(self, stream, payload, received, parsed, message=None):
+        """Hand a decoded payload to the callbacks of its stream."""
+        latency = self.latency
+        if latency:
+            latency.begin(latency.stamp_frame(stream, payload, received, parsed))
+        for callback in self.callbacks.get(stream, ()):
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"Error handling {stream}: {e}")
+        if latency:
+            latency.end()
+        if self.tap and message is not None:
+            self.tap(stream, message)
+
+    def stats(self):
+        """Return connection and subscription counts."""
+        with self.lock:
+            return {
+                "connections": len(self.connections),
+                "streams": len(self.callbacks),
+                "callbacks": sum(len(cbs) for cbs in self.callbacks.values())
+            }
+
+    def close(self):
+        """Close every connection."""
+        self.closed_event.set()
+        with self.lock:
+            self.is_closed = True
+            for conn in self.connections:
+                conn.stop()
+            self.connections = []
+            self.callbacks = {}
+            self.owners = {}
+
+
+_shared_hub = None
+
+
+def get_hub():
+    """Return the process-wide hub, creating it on first use."""
+    global _shared_hub
+    if _shared_hub is None:
+        _shared_hub = StreamHub()
+    return _shared_hub
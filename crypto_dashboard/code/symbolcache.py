@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+
+
+class MarketState:
+    """Warm market data for one symbol, filled in by the panels.
+
+    Each panel owns one attribute: the order book sets ``book``, the trades
+    panel ``trades``, the chart ``candles`` and the statistics table
+    ``stats`` and ``analytics``.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.book = None
+        self.trades = None
+        self.candles = None
+        self.stats = None
+        self.analytics = None
+
+    def nbytes(self):
+        """Rough memory footprint, used for the cache's memory budget."""
+        size = 1024
+        if self.book is not None:
+            bids, asks = self.book.depth()
+            size += (bids + asks) * 120
+        if self.trades is not None:
+            size += self.trades.nbytes
+        if self.candles is not None:
+            size += self.candles.nbytes
+        if self.analytics is not None:
+            size += self.analytics.nbytes
+        return size
+
+
+class SymbolCache:
+    """LRU cache of warm per-symbol market state.
+
+    Panels keep streaming into every cached symbol, so switching back to
+    one repaints at once from local state. When the cache grows past
+    ``max_symbols`` or ``max_bytes`` the least recently used symbol is
+    evicted and listeners are told so they can unsubscribe its streams.
+    """
+
+    def __init__(self, max_symbols=4, max_bytes=64 * 1024 * 1024):
+        self.max_symbols = max(1, max_symbols)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.states = OrderedDict()
+        self.listeners = []
+
+    def add_evict_listener(self, callback):
+        """Call ``callback(symbol, state)`` whenever a symbol is evicted."""
+        self.listeners.append(callback)
+
+    def touch(self, symbol):
+        """Mark a symbol most recently used and return its state."""
+        with self.lock:
+            state = self.states.get(symbol)
+            if state is None:
+                state = MarketState(symbol)
+                self.states[symbol] = state
+            self.states.move_to_end(symbol)
+            evicted = self._enforce_limits()
+        self._notify(evicted)
+        return state
+
+    def peek(self, symbol):
+        """Return a symbol's state without changing its recency, or None."""
+        return self.states.get(symbol)
+
+    def _enforce_limits(self):
+        """Pop least recently used states until within limits (lock held)."""
+        evicted = []
+        while len(self.states) > 1 and (
+                len(self.states) > self.max_symbols
+                or sum(s.nbytes() for s in self.states.values()) > self.max_bytes):
+            evicted.append(self.states.popitem(last=False))
+        return evicted
+
+    def _notify(self, evicted):
+        for symbol, state in evicted:
+            for callback in self.listeners:
+                try:
+                    callback(symbol, state)
+                except Exception as e:
+                    print(f"Error evicting {symbol}: {e}")
+
+    def memory_usage(self):
+        """Return the estimated bytes held by all cached symbols."""
+        with self.lock:
+            return sum(s.nbytes() for s in self.states.values())
+
+    def symbols(self):
+        """Return cached symbols, least recently used first."""
+        with self.lock:
+            return list(self.states)
+
+
+_shared_cache = None
+
+
+def get_symbol_cache():
+    """Return the process-wide symbol cache, creating it on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SymbolCache()
+    return _shared_cache
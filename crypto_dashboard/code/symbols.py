@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from decimal import Decimal
+
+SYMBOLS_FILE = "symbols.json"
+QUOTE = "USDT"  # the panels follow USDT pairs
+
+
+def _decimals(step):
+    """Decimal places of a filter step such as "0.01000000"."""
+    return max(0, -Decimal(step).normalize().as_tuple().exponent)
+
+
+class SymbolInfo:
+    """Trading rules of one symbol and formatters compiled for its precision.
+
+    ``price``, ``qty`` and ``volume`` (grouped quantity) are bound
+    ``str.format`` methods built once per symbol, so the panels' hot paths
+    format a number with a single call and no precision logic.
+    """
+    __slots__ = ("symbol", "base", "quote", "tick_size", "step_size",
+                 "price_decimals", "qty_decimals", "price", "qty", "volume")
+
+    def __init__(self, symbol, base, quote, tick_size="0.01", step_size="0.0001"):
+        self.symbol = symbol
+        self.base = base
+        self.quote = quote
+        self.tick_size = float(tick_size)
+        self.step_size = float(step_size)
+        self.price_decimals = _decimals(tick_size)
+        self.qty_decimals = _decimals(step_size)
+        self.price = f"{{:,.{self.price_decimals}f}}".format
+        self.qty = f"{{:.{self.qty_decimals}f}}".format
+        self.volume = f"{{:,.{self.qty_decimals}f}}".format
+
+    def row(self):
+        return [self.symbol, self.base, self.quote, repr(self.tick_size), repr(self.step_size)]
+
+
+def _parse(entry):
+    """Build a SymbolInfo from one exchangeInfo symbol entry."""
+    filters = {f["filterType"]: f for f in entry.get("filters", ())}
+    tick = filters.get("PRICE_FILTER", {}).get("tickSize", "0.01")
+    step = filters.get("LOT_SIZE", {}).get("stepSize", "0.0001")
+    return SymbolInfo(entry["symbol"], entry["baseAsset"], entry["quoteAsset"], tick, step)
+
+
+class SymbolUniverse:
+    """Tradable USDT pairs from ``/api/v3/exchangeInfo``.
+
+    The trimmed list is kept in SYMBOLS_FILE and only refetched once it is
+    older than ``ttl``; when the exchange can't be reached a stale file is
+    still used. Search goes through a sorted index of base assets and
+    symbol names, so a prefix lookup is a bisect plus a short scan.
+    Unknown symbols get default two/four decimal formatters.
+    """
+
+    def __init__(self, path=SYMBOLS_FILE, ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.symbols = {}   # "BTCUSDT" -> SymbolInfo
+        self.keys = []      # sorted (search key, symbol)
+        self.fallback = {}
+
+    def load(self, bootstrap):
+        """Load the cached list, refreshing it from the exchange when stale."""
+        cached = self._read_cache()
+        if cached is None or time.time() - cached["fetched"] > self.ttl:
+            try:
+                data = bootstrap.get_json("/api/v3/exchangeInfo",
+                                          {"symbolStatus": "TRADING"}, timeout=15)
+                infos = [_parse(entry) for entry in data["symbols"]
+                         if entry.get("quoteAsset") == QUOTE
+                         and entry.get("status", "TRADING") == "TRADING"]
+                self._write_cache(infos)
+                self._set(infos)
+                return
+            except Exception as e:
+                print(f"Error fetching exchange info: {e}")
+                if cached is None:
+                    return
+        self._set([SymbolInfo(*row) for row in cached["symbols"]])
+
+    def _read_cache(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, infos):
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"fetched": time.time(), "symbols": [i.row() for i in infos]}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Error saving symbols: {e}")
+
+    def _set(self, infos):
+        symbols = {info.symbol: info for info in infos}
+        keys = sorted({(key, info.symbol) for info in infos for key in (info.base, info.symbol)})
+        # Swapped in whole, so readers on other threads never see a partial index
+        self.symbols, self.keys = symbols, keys
+
+    def get(self, symbol):
+        """Return the SymbolInfo of ``symbol`` such as "BTCUSDT"."""
+        info = self.symbols.get(symbol)
+        if info is None:
+            info = self.fallback.get(symbol)
+            if info is None:
+                base = symbol[:-len(QUOTE)] if symbol.endswith(QUOTE) else symbol
+                info = self.fallback[symbol] = SymbolInfo(symbol, base, QUOTE)
+        return info
+
+    def search(self, text, limit=10):
+        """Return up to ``limit`` pairs whose base asset or symbol starts with ``text``."""
+        prefix = text.strip().upper()
+        if not prefix:
+            return []
+        keys, symbols = self.keys, self.symbols
+        results = []
+        seen = set()
+        for i in range(bisect_left(keys, (prefix,)), len(keys)):
+            key, symbol = keys[i]
+            if not key.startswith(prefix):
+                break
+            if symbol not in seen:
+                seen.add(symbol)
+                results.append(symbols[symbol])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_shared_universe = None
+
+
+def get_symbol_universe():
+    """Return the process-wide symbol universe, creating it on first use."""
+    global _shared_universe
+    if _shared_universe is None:
+        _shared_universe = SymbolUniverse()
+    return _shared_universe
@@ -1,30 +1,24 @@
 import tkinter as tk
-from tkinter import ttk
-import websocket
-import json
-import threading
-import requests
-from datetime import datetime
-from collections import deque
-import os
-
-# For candlestick chart
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-import numpy as np
+
+from streams import get_hub
+from scheduler import get_scheduler
+from symbols import get_symbol_universe
 
 class CryptoTicker:
     """Reusable ticker component for any cryptocurrency."""
 
-    def __init__(self, parent, symbol, display_name, on_select_callback=None):
+    def __init__(self, parent, symbol, display_name, on_select_callback=None, hub=None, scheduler=None,
+                 symbols=None):
         self.parent = parent
         self.symbol = symbol.lower()
         self.display_name = display_name
         self.is_active = False
-        self.ws = None
+        self.hub = hub or get_hub()
+        self.stream = f"{self.symbol}@ticker"
+        self.scheduler = scheduler or get_scheduler(parent)
+        self.scheduler.register(self, self.update_display)
         self.on_select_callback = on_select_callback
+        self.symbols = symbols or get_symbol_universe()
         self.current_price = 0
         self.price_change = 0
         self.price_change_percent = 0
@@ -84,42 +78,28 @@ class CryptoTicker:
             self.on_select_callback(self.symbol.upper().replace("USDT", ""))
 
     def start(self):
-        """Start WebSocket connection."""
+        """Subscribe to the ticker stream."""
         if self.is_active:
             return
         self.is_active = True
-
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol}@ticker"
-
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self.on_message,
-            on_error=lambda ws, err: print(f"{self.symbol} error: {err}"),
-            on_close=lambda ws, s, m: print(f"{self.symbol} closed"),
-            on_open=lambda ws: print(f"{self.symbol} connected")
-        )
-
-        threading.Thread(target=self.ws.run_forever, daemon=True).start()
+        self.hub.subscribe(self.stream, self.on_message)
 
     def stop(self):
-        """Stop WebSocket connection."""
+        """Unsubscribe from the ticker stream."""
         self.is_active = False
-        if self.ws:
-            self.ws.close()
-            self.ws = None
+        self.hub.unsubscribe(self.stream, self.on_message)
 
-    def on_message(self, ws, message):
+    def on_message(self, data):
         """Handle price updates."""
         if not self.is_active:
             return
 
-        data = json.loads(message)
-        self.current_price = float(data['c'])
-        self.price_change = float(data['p'])
-        self.price_change_percent = float(data['P'])
+        self.current_price = data.last
+        self.price_change = data.change
+        self.price_change_percent = data.change_pct
 
-        # Schedule GUI update on main thread
-        self.parent.after(0, self.update_display)
+        # Repainted on the next scheduler frame
+        self.scheduler.mark_dirty(self)
 
     def update_display(self):
         """Update the ticker display."""
@@ -128,13 +108,8 @@ class CryptoTicker:
 
         color = "#00ff88" if self.price_change >= 0 else "#ff4444"
 
-        # Format price based on magnitude
-        if self.current_price >= 1000:
-            price_text = f"${self.current_price:,.2f}"
-        elif self.current_price >= 1:
-            price_text = f"${self.current_price:.2f}"
-        else:
-            price_text = f"${self.current_price:.4f}"
+        # Price at the symbol's tick size
+        price_text = "$" + self.symbols.get(self.symbol.upper()).price(self.current_price)
 
         self.price_label.config(text=price_text, fg=color)
 
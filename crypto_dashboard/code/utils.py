@@ -1,35 +1,163 @@
+import copy
 import json
 import os
+import threading
 
 CONFIG_FILE = "dashboard_config.json"
+SCHEMA_VERSION = 1
 
-def load_preferences():
-    default_prefs = {
-        "visible_panels": {
-            "order_book": True,
-            "trades": True,
-            "chart": True,
-            "price_table": True
-        },
-        "enabled_cryptos": {
-            "BTC": True,
-            "ETH": True,
-            "SOL": True,
-            "DOGE": True,
-            "XRP": True,
-            "ADA": False,
-            "MATIC": False
-        },
-        "selected_symbol": "BTC"
+DEFAULT_PREFERENCES = {
+    "version": SCHEMA_VERSION,
+    "visible_panels": {
+        "order_book": True,
+        "trades": True,
+        "chart": True,
+        "price_table": True
+    },
+    "enabled_cryptos": {
+        "BTC": True,
+        "ETH": True,
+        "SOL": True,
+        "DOGE": True,
+        "XRP": True,
+        "ADA": False,
+        "MATIC": False
+    },
+    "selected_symbol": "BTC",
+    "target_fps": 20,
+    "latency_overlay": False,
+    "decoder": "auto",
+    "ingest_process": False,
+    "symbol_cache": {
+        "max_symbols": 4,
+        "max_mb": 64
     }
+}
 
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
 
-    return default_prefs
+# version -> function upgrading a preferences dict to the next version.
+# Files written before versioning have the version 1 layout.
+MIGRATIONS = {}
 
 
-def save_preferences(prefs):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(prefs, f, indent=2)
\ No newline at end of file
+def _merge_defaults(prefs, defaults):
+    """Fill keys missing from ``prefs`` (recursively) with copies of the defaults.
+
+    A value whose type doesn't match its default, such as a hand-edited
+    ``"visible_panels": null``, is replaced by the default as well.
+    """
+    for key, value in defaults.items():
+        if key not in prefs or not isinstance(prefs[key], type(value)):
+            prefs[key] = copy.deepcopy(value)
+        elif isinstance(value, dict):
+            _merge_defaults(prefs[key], value)
+    return prefs
+
+
+def load_preferences(path=CONFIG_FILE):
+    """Return saved preferences upgraded to SCHEMA_VERSION and merged with the defaults.
+
+    A file that can't be parsed is moved aside to ``<path>.corrupt`` and
+    the defaults are used.
+    """
+    prefs = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                prefs = json.load(f)
+            if not isinstance(prefs, dict):
+                raise ValueError("not a JSON object")
+        except (OSError, ValueError) as e:
+            print(f"Error loading preferences: {e}; using defaults")
+            try:
+                os.replace(path, path + ".corrupt")
+            except OSError:
+                pass
+            prefs = {}
+        else:
+            version = prefs.get("version", 1)
+            if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+                print(f"Error loading preferences: bad version {version!r}; assuming 1")
+                version = 1
+            while version < SCHEMA_VERSION:
+                MIGRATIONS[version](prefs)
+                version += 1
+            prefs["version"] = version
+
+    return _merge_defaults(prefs, DEFAULT_PREFERENCES)
+
+
+def _write_atomic(path, text):
+    """Replace ``path`` with ``text`` so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_preferences(prefs, path=CONFIG_FILE):
+    _write_atomic(path, json.dumps(prefs, indent=2))
+
+
+class PreferencesStore:
+    """Preferences kept in memory and written behind the UI.
+
+    ``set`` changes a value and (re)starts a ``delay`` second timer, so a
+    burst of changes is written once, ``delay`` seconds after the last
+    one, on the timer thread with an atomic replace. Changes go through ``set`` so the
+    writer never serialises a dict that is being modified. ``close``
+    writes anything still pending.
+    """
+
+    def __init__(self, path=CONFIG_FILE, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.data = load_preferences(path)
+        self.lock = threading.Lock()        # guards data, dirty and timer
+        self.write_lock = threading.Lock()  # keeps writes in order
+        self.dirty = False
+        self.timer = None
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        """Set a top-level key, or a nested one given as a tuple path."""
+        path = key if isinstance(key, tuple) else (key,)
+        with self.lock:
+            target = self.data
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+            self.dirty = True
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty:
+                    return
+                self.dirty = False
+                text = json.dumps(self.data, indent=2)
+            try:
+                _write_atomic(self.path, text)
+            except OSError as e:
+                print(f"Error saving preferences: {e}")
+                with self.lock:
+                    self.dirty = True  # retried by the next write or close
+
+    def close(self):
+        self.flush()